@@ -0,0 +1,77 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Compare the throughput (in lines per second) of `LoadgenParser.df` and of parsing every line with regular expressions
+(`LoadgenParser.extract_values_from_log_with_regexes`) on a synthetic loadgen log, and check that they produce the same
+data frame."""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from parsers import loadgen_parser
+
+# Constants
+# (method, path, query string) of requests made by `loadgen/buzzblog.py`.
+REQUESTS = [
+    ("POST", "/account", ""),
+    ("PUT", "/account/{id}", ""),
+    ("GET", "/account/{id}", ""),
+    ("POST", "/post", ""),
+    ("DELETE", "/post/{id}", ""),
+    ("GET", "/post", "limit=10&offset=0&"),
+    ("GET", "/post", "author_id={id}&limit=10&offset=0&"),
+    ("GET", "/post/{id}", ""),
+    ("POST", "/follow", ""),
+    ("DELETE", "/follow/{id}", ""),
+    ("GET", "/follow", "followee_id={id}&limit=10&offset=0&"),
+    ("GET", "/follow", "follower_id={id}&limit=10&offset=0&"),
+    ("POST", "/like", ""),
+    ("DELETE", "/like/{id}", ""),
+    ("GET", "/like", "post_id={id}&limit=10&offset=0&"),
+    ("GET", "/like", "account_id={id}&limit=10&offset=0&"),
+    ("GET", "/trending", "limit=10&"),
+]
+
+
+def synthetic_log(n_lines, seed):
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n_lines):
+        method, path, query_string = rng.choice(REQUESTS)
+        ids = {"id": rng.randrange(1, 1000000)}
+        lines.append("[2022-01-01 00:%02d:%02d.%03d] %s http://loadbal:8080%s?%srequest_id=%08x %s - latency=%.3f%s\n" % (
+                i // 60000 % 60, i // 1000 % 60, i % 1000, method, path.format(**ids), query_string.format(**ids),
+                rng.getrandbits(32), rng.choice([200] * 99 + [500]), rng.expovariate(100),
+                " lag=%.3f" % rng.expovariate(1000) if i % 2 else ""))
+    return lines
+
+
+def regexes_df(lines):
+    data = [loadgen_parser.LoadgenParser.extract_values_from_log_with_regexes(line) for line in lines]
+    return pd.DataFrame(data=[d for d in data if d], columns=loadgen_parser.COLUMNS)
+
+
+def parse(df, lines):
+    start_time = time.perf_counter()
+    return df(lines), len(lines) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loadgen log parsing")
+    parser.add_argument("--lines", required=False, default=200000, action="store",
+            type=int, help="Number of log lines")
+    parser.add_argument("--seed", required=False, default=0, action="store",
+            type=int, help="Random number generator seed")
+    args = parser.parse_args()
+    lines = synthetic_log(args.lines, args.seed)
+    expected_df, regexes_rate = parse(regexes_df, lines)
+    df, rate = parse(loadgen_parser.LoadgenParser.df, lines)
+    pd.testing.assert_frame_equal(expected_df, df)
+    print("regexes: %.0f lines/s" % regexes_rate)
+    print("LoadgenParser.df: %.0f lines/s (%.1fx)" % (rate, rate / regexes_rate))
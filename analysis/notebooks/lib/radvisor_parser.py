@@ -3,13 +3,17 @@
 
 """
 Simple dataclass-based parsers for both rAdvisor target (container) logs
-and buffer flush logs
+and buffer flush logs, and a columnar loader of target logs
 """
 
 from dataclasses import dataclass
 from typing import List, Dict, Iterable, Any, Tuple, Union, OrderedDict
 from yaml import Loader
 import csv
+import io
+
+import numpy as np
+import pandas as pd
 
 # Minimum target log version that this supports
 MIN_TARGET_LOG_VERSION="1.3.0"
@@ -159,14 +163,12 @@ class BufferFlushLogEntry:
             success=row["success"].lower() == 'true')
 
 
-def parse_target_log(lines: Iterable[str]) -> Tuple[Iterable[TargetLogEntry], Dict[str, Any]]:
+def parse_target_log_metadata(lines: Iterable[str]) -> Dict[str, Any]:
     """
-    Loads an output target file from rAdvisor into
-    a lazy iterator of TargetLogEntry in the order of logging,
-    in addition to the metadata dictionary contained at the top of the logfile.
+    Loads the metadata dictionary contained at the top of an output target file
+    from rAdvisor, leaving `lines` at the header of its CSV section.
     """
 
-    metadata = {}
     yaml_lines = []
 
     # Skip the first yaml delimeter
@@ -193,7 +195,18 @@ def parse_target_log(lines: Iterable[str]) -> Tuple[Iterable[TargetLogEntry], Di
     if version < MIN_TARGET_LOG_VERSION:
         print(f"Warning: rAdvisor log version '{version}' "
             f"is less than minimum version '{MIN_TARGET_LOG_VERSION}'")
-    
+
+    return metadata
+
+
+def parse_target_log(lines: Iterable[str]) -> Tuple[Iterable[TargetLogEntry], Dict[str, Any]]:
+    """
+    Loads an output target file from rAdvisor into
+    a lazy iterator of TargetLogEntry in the order of logging,
+    in addition to the metadata dictionary contained at the top of the logfile.
+    """
+
+    metadata = parse_target_log_metadata(lines)
     csv_reader = csv.DictReader(lines)
     def generator():
         for row in csv_reader:
@@ -206,6 +219,57 @@ def parse_target_log(lines: Iterable[str]) -> Tuple[Iterable[TargetLogEntry], Di
     return (generator(), metadata)
 
 
+def load_target_log(log_file: io.TextIOBase) -> Tuple[pd.DataFrame, np.ndarray, Dict[str, Any]]:
+    """
+    Loads an output target file from rAdvisor into a data frame
+    with a column per statistic, named like the fields of TargetLogEntry
+    (IOStats are split into columns suffixed with `_read`, `_write`, `_sync`, and `_async`),
+    the per-CPU usage (`cpu.usage.percpu`) as a 2-D array (samples x cores),
+    and the metadata dictionary contained at the top of the logfile.
+    Empty cells are loaded as 0, like in TargetLogEntry.
+    """
+
+    metadata = parse_target_log_metadata(iter(log_file.readline, ""))
+    samples = pd.read_csv(log_file, dtype={"pids.max": str, "cpu.usage.percpu": str})
+
+    dataframe = pd.DataFrame(index=samples.index)
+    for column in samples.columns:
+        if column == "pids.max":
+            # "max" if the number of PIDs is unlimited
+            values = samples[column].fillna("0")
+            dataframe["pids_max"] = values.where(values == "max",
+                pd.to_numeric(values.where(values != "max", "0")))
+        elif column != "cpu.usage.percpu":
+            dataframe[column.replace('.', '_')] = samples[column].fillna(0).astype(np.int64)
+
+    # Per-CPU usage is a space-separated list of counters per sample
+    percpu_cells = samples.get("cpu.usage.percpu", pd.Series([""] * len(samples), dtype=str)).fillna("")
+    n_cores = percpu_cells.str.count(" ").to_numpy() + (percpu_cells != "").to_numpy()
+    if len(n_cores) and (n_cores == n_cores[0]).all():
+        percpu = np.array(" ".join(percpu_cells).split(), dtype=np.int64).reshape((len(samples), n_cores[0]))
+    else:
+        # Samples with missing cores are padded with 0
+        percpu = percpu_cells.str.split(" ", expand=True).replace("", "0").fillna("0").astype(np.int64).to_numpy() \
+            if len(percpu_cells) else np.zeros((0, 0), dtype=np.int64)
+
+    return (dataframe, percpu, metadata)
+
+
+def diff_target_log(dataframe: pd.DataFrame, percpu: np.ndarray) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Adds columns `time` (ns since the first sample) and `time_diff` (ns since the previous sample)
+    to a data frame loaded by load_target_log, and returns it with the per-CPU usage (in ns) since
+    the previous sample, as a 2-D array of floats (samples x cores) whose first row is NaN.
+    Decreasing counters count as 0.
+    """
+
+    dataframe["time"] = dataframe["read"] - dataframe["read"].min()
+    dataframe["time_diff"] = dataframe["time"].diff()
+    percpu_diff = np.full(percpu.shape, np.nan)
+    percpu_diff[1:] = np.maximum(np.diff(percpu, axis=0), 0)
+    return (dataframe, percpu_diff)
+
+
 def parse_buffer_flush_log(lines: Iterable[str]) -> OrderedDict[int, BufferFlushLogEntry]:
     """
     Loads a buffer flush log from rAdvisor into an ordered dictionary
@@ -1,11 +1,12 @@
 # Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
 # Systems
 
-import argparse
 import datetime
 import gzip
+import io
 import re
 
+import numpy as np
 import pandas as pd
 
 # Constants
@@ -20,6 +21,9 @@ COLUMNS = {
     "mem": ["timestamp", "hw_no"] + HW_METRICS["mem"],
     "dsk": ["timestamp", "hw_no"] + HW_METRICS["dsk"]
 }
+DTYPES = {hw_type: dict([("timestamp", "datetime64[ns]"), ("hw_no", "int16")] +
+        [(metric, "category" if metric == "name" else "float64") for metric in metrics])
+        for (hw_type, metrics) in HW_METRICS.items()}
 FILE_EXTENSION_TO_HW_TYPE = {
     "cpu": "cpu",
     "numa": "mem",
@@ -30,32 +34,45 @@ FILE_EXTENSION_TO_HW_TYPE = {
 class CollectlParser:
     @classmethod
     def df(cls, logfile, hw_type):
+        """Parse a collectl plot file (opened in text mode) into a data frame with a row per sample and hardware
+        component (e.g., CPU core), with timestamps in UTC."""
+        offset = datetime.timedelta()
+        log = ""
         for log in logfile:
-            if log[0] == '#':
-                timezone = re.findall(r"TZ: ([-+]\d{4})", log)
-                if timezone:
-                    offset = datetime.timedelta(hours=(1 if timezone[0][0] == '+' else -1) * int(timezone[0][1:3]))
-            else:
+            if log[0] != '#':
                 break
-        return pd.DataFrame([entry for log in logfile for entry in cls.extract_values_from_log(log, hw_type, offset)],
-                columns=COLUMNS[hw_type])
-
-    @staticmethod
-    def extract_values_from_log(log, hw_type, offset):
-        values = log.split()
-        timestamp = datetime.datetime.strptime(" ".join(values[:2]), "%Y%m%d %H:%M:%S.%f") - offset
-        for hw_no in range((len(values) - 2) // len(HW_METRICS[hw_type])):
-            yield (timestamp, hw_no,
-                    *values[2 + hw_no * len(HW_METRICS[hw_type]):2 + (hw_no + 1) * len(HW_METRICS[hw_type])])
+            timezone = re.findall(r"TZ: ([-+])(\d{2})(\d{2})", log)
+            if timezone:
+                sign, hours, minutes = timezone[0]
+                offset = (1 if sign == '+' else -1) * datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        else:
+            # The header was not followed by samples.
+            log = ""
+        if not log:
+            return pd.DataFrame(columns=COLUMNS[hw_type])
+        n_metrics = len(HW_METRICS[hw_type])
+        n_hws = (len(log.split()) - 2) // n_metrics
+        # Columns are date, time, and the metrics of every hardware component, separated by single spaces. Their
+        # dtypes are set so that they are not inferred.
+        dtypes = {0: str, 1: str}
+        dtypes.update({2 + hw_no * n_metrics + metric_no: str if metric == "name" else np.float64
+                for hw_no in range(n_hws) for (metric_no, metric) in enumerate(HW_METRICS[hw_type])})
+        # The first sample line was consumed by the loop above.
+        samples = pd.read_csv(io.StringIO(log + logfile.read()), sep=' ', header=None, names=list(dtypes),
+                usecols=list(dtypes), dtype=dtypes, comment='#')
+        # The last line may be cut short if collectl was stopped while writing it.
+        samples = samples[samples.iloc[:, -1].notna()]
+        timestamps = pd.to_datetime(samples[0] + " " + samples[1], format="%Y%m%d %H:%M:%S.%f") - offset
+        data = {"timestamp": np.repeat(timestamps.to_numpy(), n_hws), "hw_no": np.tile(np.arange(n_hws), len(samples))}
+        for (metric_no, metric) in enumerate(HW_METRICS[hw_type]):
+            # Columns of metric `metric_no` of every hardware component, flattened sample by sample.
+            data[metric] = samples.iloc[:, 2 + metric_no:2 + n_hws * n_metrics:n_metrics].to_numpy().ravel()
+        return pd.DataFrame(data, columns=COLUMNS[hw_type])
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate CSV file")
-    parser.add_argument("--log_filepath", required=True, action="store",
-            type=str, help="Path to log file (input)")
-    parser.add_argument("--csv_filepath", required=True, action="store",
-            type=str, help="Path to CSV file (output)")
-    args = parser.parse_args()
+    import driver
+    args = driver.parse_args(driver.argument_parser(workers_help=None))
+    hw_type = FILE_EXTENSION_TO_HW_TYPE[args.log_filepath.split('.')[-2]]
     with gzip.open(args.log_filepath, "rt") as logfile:
-        CollectlParser.df(logfile,
-                FILE_EXTENSION_TO_HW_TYPE[args.log_filepath.split('.')[-2]]).to_csv(args.csv_filepath, index=False)
+        driver.write(CollectlParser.df(logfile, hw_type), DTYPES[hw_type], args.csv_filepath, args.parquet_filepath)
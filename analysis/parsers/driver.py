@@ -0,0 +1,154 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Parse a log file in chunks of lines with a pool of processes.
+
+The file is split on line boundaries into byte ranges of about `CHUNK_SIZE` bytes (at least one per worker). Every
+worker parses a byte range with the `df` method of a parser class (e.g., `rpc_parser.RPCParser`) as if it were a whole
+log file, and the resulting data frames are concatenated in order.
+
+Parsed data frames are written to CSV files, or to Parquet files with typed columns (`DTYPES` of parser modules), which
+are read back without parsing timestamps and numbers again. Parquet files require `pyarrow`. Data frames parsed in
+batches (e.g., by `tail_parser`) are appended to the same files, as row groups of Parquet files.
+
+Parser scripts import this module in their `__main__` blocks only, because parsers are also imported as modules of
+package `parsers` (e.g., by `utils.utils`)."""
+
+import argparse
+import concurrent.futures
+import io
+import math
+import multiprocessing
+import os
+
+import pandas as pd
+
+# Constants
+CHUNK_SIZE = 1 << 26
+
+
+def argument_parser(workers_help="Number of processes parsing chunks of the log file"):
+    """Parser of the command-line arguments of parser scripts: input log file, output files, and number of workers
+    (without `workers_help`, parser scripts run in a single process)."""
+    parser = argparse.ArgumentParser(description="Generate CSV or Parquet file")
+    parser.add_argument("--log_filepath", required=True, action="store",
+            type=str, help="Path to log file (input)")
+    parser.add_argument("--csv_filepath", required=False, default="", action="store",
+            type=str, help="Path to CSV file (output)")
+    parser.add_argument("--parquet_filepath", required=False, default="", action="store",
+            type=str, help="Path to Parquet file with typed columns (output)")
+    if workers_help:
+        parser.add_argument("--workers", required=False, default=1, action="store",
+                type=int, help=workers_help)
+    return parser
+
+
+def parse_args(parser):
+    """Parse command-line arguments (see `argument_parser`), of which at least one output file."""
+    args = parser.parse_args()
+    if not args.csv_filepath and not args.parquet_filepath:
+        parser.error("at least one of --csv_filepath and --parquet_filepath is required")
+    return args
+
+
+def chunk_boundaries(log_filepath, n_chunks):
+    """Split a file into up to `n_chunks` byte ranges of similar size that start and end on line boundaries."""
+    size = os.path.getsize(log_filepath)
+    offsets = [0]
+    with open(log_filepath, "rb") as logfile:
+        for chunk_no in range(1, n_chunks):
+            offset = size * chunk_no // n_chunks
+            if offset <= offsets[-1]:
+                continue
+            # Ranges end after the line that their tentative end falls in.
+            logfile.seek(offset - 1)
+            logfile.readline()
+            offset = logfile.tell()
+            if offset >= size:
+                break
+            if offset > offsets[-1]:
+                offsets.append(offset)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def parse_chunk(parser, log_filepath, start, end):
+    """Parse the lines of a file in byte range [`start`, `end`) with `parser.df`."""
+    with open(log_filepath, "rb") as logfile:
+        logfile.seek(start)
+        return parser.df(io.TextIOWrapper(io.BytesIO(logfile.read(end - start))))
+
+
+def df(parser, log_filepath, workers=1):
+    """Parse a log file with `parser.df` in `workers` processes."""
+    if workers <= 1:
+        with open(log_filepath) as logfile:
+            return parser.df(logfile)
+    chunks = chunk_boundaries(log_filepath,
+            max(workers, math.ceil(os.path.getsize(log_filepath) / CHUNK_SIZE)))
+    # Workers are forked so that parsers defined in `__main__` (i.e., run as scripts) can be passed to them.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+            mp_context=multiprocessing.get_context("fork")) as executor:
+        dfs = list(executor.map(parse_chunk, *zip(*[(parser, log_filepath, start, end) for (start, end) in chunks])))
+    return pd.concat([df for df in dfs if len(df)] or dfs[:1], ignore_index=True)
+
+
+def typed(df, dtypes):
+    """Convert the columns of a parsed data frame to `dtypes`, a dict mapping column names to dtypes."""
+    df = df.copy()
+    for (column, dtype) in dtypes.items():
+        if dtype == "datetime64[ns]":
+            df[column] = pd.to_datetime(df[column]).astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def write(df, dtypes, csv_filepath="", parquet_filepath=""):
+    """Write a parsed data frame to a CSV file and/or to a Parquet file with columns of `dtypes`."""
+    if csv_filepath:
+        df.to_csv(csv_filepath, index=False)
+    if parquet_filepath:
+        typed(df, dtypes).to_parquet(parquet_filepath, index=False)
+
+
+class Appender:
+    """Append data frames parsed in batches to a CSV file and/or to a Parquet file with columns of `dtypes`.
+
+    The CSV file has a header only before the first batch. Every batch is a row group of the Parquet file, which is
+    readable only after `close`."""
+
+    def __init__(self, dtypes, csv_filepath="", parquet_filepath=""):
+        self._dtypes = dtypes
+        self._csv_filepath = csv_filepath
+        self._parquet_filepath = parquet_filepath
+        self._parquet_writer = None
+        self._n_batches = 0
+
+    def append(self, df):
+        if not len(df):
+            return
+        if self._csv_filepath:
+            df.to_csv(self._csv_filepath, mode="w" if self._n_batches == 0 else "a", header=self._n_batches == 0,
+                    index=False)
+        if self._parquet_filepath:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._parquet_writer is None:
+                # Categories differ across batches, so dictionaries have indices wide enough for any batch.
+                schema = pa.Schema.from_pandas(typed(df, self._dtypes), preserve_index=False)
+                for (i, field) in enumerate(schema):
+                    if pa.types.is_dictionary(field.type):
+                        schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+                self._parquet_writer = pq.ParquetWriter(self._parquet_filepath, schema)
+            self._parquet_writer.write_table(pa.Table.from_pandas(typed(df, self._dtypes),
+                    schema=self._parquet_writer.schema, preserve_index=False))
+        self._n_batches += 1
+
+    def close(self):
+        """Finish the output files. Without any batch, they are written as empty data frames."""
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        elif self._n_batches == 0:
+            write(pd.DataFrame(columns=list(self._dtypes)), self._dtypes, self._csv_filepath,
+                    self._parquet_filepath)
@@ -1,14 +1,18 @@
 # Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
 # Systems
 
-import argparse
 import re
 
+import numpy as np
 import pandas as pd
 
 # Constants
-COLUMNS = ["timestamp", "method", "url", "request_id", "status_code", "latency", "status", "type", "rw"]
-REQUEST_LOG_PATTERN = r"^\[(\d+\-\d+\-\d+ \d+:\d+:\d+.\d+)\] (.+) (.+) (\d+) - latency=(\d+.\d+)$"
+COLUMNS = ["timestamp", "method", "url", "request_id", "status_code", "latency", "status", "type", "rw", "lag",
+        "corrected_latency"]
+DTYPES = {"timestamp": "datetime64[ns]", "method": "category", "url": "object", "request_id": "object", "status_code": "int16",
+        "latency": "float32", "status": "category", "type": "category", "rw": "category", "lag": "float32",
+        "corrected_latency": "float32"}
+REQUEST_LOG_PATTERN = r"^\[(\d+\-\d+\-\d+ \d+:\d+:\d+.\d+)\] (.+) (.+) (\d+) - latency=(\d+.\d+)(?: lag=(\d+.\d+))?$"
 URL_PATTERN = r"^http://[\w\.\-]+:\d+/{path}/?\??{qs}$"
 REQUEST_TO_TYPE = {
     (URL_PATTERN.format(path="account/\d+", qs=""), "GET"): "retrieve_account",
@@ -29,6 +33,71 @@ REQUEST_TO_TYPE = {
     (URL_PATTERN.format(path="post/\d+", qs=""), "DELETE"): "delete_post",
     (URL_PATTERN.format(path="trending", qs=""), "GET"): "list_trending_hashtags"
 }
+# Binary request log format (see `loadgen/binary_log.py`).
+BINARY_LOG_MAGIC = b"BBRL"
+BINARY_LOG_VERSION = 1
+BINARY_LOG_BATCH_HEADER = np.dtype([("magic", "S4"), ("version", "<u2"), ("n_records", "<u4"), ("wall_ns", "<i8"),
+        ("monotonic_ns", "<i8"), ("utc_offset", "<i4")])
+BINARY_LOG_RECORD = np.dtype([("type", "u1"), ("method", "u1"), ("path_template", "u1"), ("request_id", "S8"),
+        ("status_code", "<u2"), ("start_ns", "<i8"), ("latency_us", "<u4"), ("lag_us", "<u4")])
+BINARY_LOG_REQUEST_TYPES = ["create_account", "update_account", "create_post", "delete_post", "follow_account",
+        "delete_follow", "like_post", "delete_like", "retrieve_recent_posts", "retrieve_post", "retrieve_post_likes",
+        "retrieve_account", "retrieve_account_posts", "retrieve_account_followers", "retrieve_account_followees",
+        "retrieve_account_likes", "list_trending_hashtags"]
+BINARY_LOG_METHODS = ["GET", "POST", "PUT", "DELETE"]
+BINARY_LOG_PATH_TEMPLATES = ["/account", "/account/{id}", "/follow", "/follow/{id}", "/like", "/like/{id}", "/post",
+        "/post/{id}", "/trending"]
+# Request log lines are tokenized with `FAST_REQUEST_LOG_PATTERN`, and their request types are resolved through
+# `ROUTE_TRIE`, which maps methods to path segments (`int` standing for numeric segments) to query parameters (None if
+# there is none) left after removing `IGNORED_QUERY_PARAMETERS` and `request_id`. Lines that they cannot parse exactly
+# as `REQUEST_LOG_PATTERN` and `REQUEST_TO_TYPE` would are parsed with them instead.
+ROUTES = [
+    ("GET", "/account/{id}", None, "retrieve_account"),
+    ("POST", "/account", None, "create_account"),
+    ("PUT", "/account/{id}", None, "update_account"),
+    ("GET", "/follow", "followee_id", "retrieve_account_followers"),
+    ("GET", "/follow", "follower_id", "retrieve_account_followees"),
+    ("POST", "/follow", None, "follow_account"),
+    ("DELETE", "/follow/{id}", None, "delete_follow"),
+    ("GET", "/like", "account_id", "retrieve_account_likes"),
+    ("GET", "/like", "post_id", "retrieve_post_likes"),
+    ("POST", "/like", None, "like_post"),
+    ("DELETE", "/like/{id}", None, "delete_like"),
+    ("GET", "/post", None, "retrieve_recent_posts"),
+    ("GET", "/post", "author_id", "retrieve_account_posts"),
+    ("GET", "/post/{id}", None, "retrieve_post"),
+    ("POST", "/post", None, "create_post"),
+    ("DELETE", "/post/{id}", None, "delete_post"),
+    ("GET", "/trending", None, "list_trending_hashtags")
+]
+IGNORED_QUERY_PARAMETERS = ["limit", "offset"]
+QUERY_PARAMETERS = IGNORED_QUERY_PARAMETERS + \
+        sorted({query_parameter for (_, _, query_parameter, _) in ROUTES if query_parameter})
+FAST_REQUEST_LOG_PATTERN = re.compile(r"^\[(\d+\-\d+\-\d+ \d+:\d+:\d+.\d+)\] (\S+) (http://[\w\.\-]+:\d+)(/[^\s?]*)"
+        r"(?:\?(\S*))? (\d+) - latency=(\d+\.\d+)(?: lag=(\d+\.\d+))?$")
+
+
+def build_route_trie(routes):
+    trie = {}
+    for (method, path, query_parameter, type) in routes:
+        node = trie.setdefault(method, {})
+        for segment in path[1:].split('/'):
+            node = node.setdefault(int if segment == "{id}" else segment, {})
+        node.setdefault(None, {})[query_parameter] = type
+    return trie
+
+
+ROUTE_TRIE = build_route_trie(ROUTES)
+
+
+def route_type(method, segments, query_parameter):
+    """Resolve the request type of a route through `ROUTE_TRIE`, or return None if there is none."""
+    node = ROUTE_TRIE.get(method)
+    for segment in segments:
+        if node is None:
+            return None
+        node = node.get(segment)
+    return node.get(None, {}).get(query_parameter) if node is not None else None
 
 
 class LoadgenParser:
@@ -37,12 +106,45 @@ class LoadgenParser:
         data = [cls.extract_values_from_log(log) for log in logfile]
         return pd.DataFrame(data=[d for d in data if d], columns=COLUMNS)
 
+    @classmethod
+    def extract_values_from_log(cls, log):
+        match = FAST_REQUEST_LOG_PATTERN.match(log)
+        values = cls.classify(*match.groups()) if match else None
+        return values or cls.extract_values_from_log_with_regexes(log)
+
     @staticmethod
-    def extract_values_from_log(log):
+    def classify(timestamp, method, url_prefix, path, query_string, status_code, latency, lag):
+        """Classify a request tokenized by `FAST_REQUEST_LOG_PATTERN` through `ROUTE_TRIE`. Return None if the
+        request is not one that `extract_values_from_log_with_regexes` would classify the same way."""
+        segments = [int if segment.isdecimal() else segment for segment in path[1:].split('/')]
+        request_id = None
+        query_parameter = None
+        for parameter in (query_string.split('&') if query_string else ()):
+            key, _, value = parameter.partition('=')
+            if key in IGNORED_QUERY_PARAMETERS and value.isdecimal():
+                continue
+            if key == "request_id" and request_id is None and value.isascii() and value.isalnum():
+                request_id = value
+            elif query_parameter is None and key in QUERY_PARAMETERS and value.isdecimal():
+                query_parameter = parameter
+            else:
+                return None
+        type = route_type(method, segments, query_parameter.partition('=')[0] if query_parameter else None)
+        if request_id is None or type is None:
+            return None
+        url = url_prefix + path + ('?' + query_parameter if query_parameter else "")
+        status = "successful" if int(status_code) == 200 else "failed"
+        rw = "read" if method == "GET" else "write"
+        lag = lag or "0.000"
+        corrected_latency = format(float(latency) + float(lag), ".3f")
+        return (timestamp, method, url, request_id, status_code, latency, status, type, rw, lag, corrected_latency)
+
+    @staticmethod
+    def extract_values_from_log_with_regexes(log):
         match = re.match(REQUEST_LOG_PATTERN, log)
         if not match:
             return None
-        timestamp, method, url, status_code, latency = match.groups()
+        timestamp, method, url, status_code, latency, lag = match.groups()
         request_id = re.findall(r"request_id=([a-zA-Z0-9]+)&?", url)[0]
         url = re.sub("limit=\d+&?", "", url)
         url = re.sub("offset=\d+&?", "", url)
@@ -52,15 +154,61 @@ class LoadgenParser:
         status = "successful" if int(status_code) == 200 else "failed"
         type = [t for ((p, m), t) in REQUEST_TO_TYPE.items() if m == method and re.match(p, url)][0]
         rw = "read" if method.upper() == "GET" else "write"
-        return (timestamp, method, url, request_id, status_code, latency, status, type, rw)
+        # Lines without lag were logged by engines that do not know the intended start time of requests.
+        lag = lag or "0.000"
+        corrected_latency = format(float(latency) + float(lag), ".3f")
+        return (timestamp, method, url, request_id, status_code, latency, status, type, rw, lag, corrected_latency)
+
+    @staticmethod
+    def is_binary_log(logfile):
+        """Check whether a log file opened in binary mode is a binary request log."""
+        return logfile.peek(len(BINARY_LOG_MAGIC))[:len(BINARY_LOG_MAGIC)] == BINARY_LOG_MAGIC
+
+    @classmethod
+    def binary_df(cls, logfile):
+        """Parse a binary request log. Its `url` column holds path templates (e.g., `/account/{id}`). A last batch that
+        was not completely written (e.g., by a killed workload generator) is parsed up to its last complete record."""
+        buffer = logfile.read()
+        batches = []
+        offset = 0
+        while offset + BINARY_LOG_BATCH_HEADER.itemsize <= len(buffer):
+            header = np.frombuffer(buffer, dtype=BINARY_LOG_BATCH_HEADER, count=1, offset=offset)[0]
+            if header["magic"] != BINARY_LOG_MAGIC or header["version"] != BINARY_LOG_VERSION:
+                raise ValueError("Not a version %s binary request log" % BINARY_LOG_VERSION)
+            offset += BINARY_LOG_BATCH_HEADER.itemsize
+            n_records = min(int(header["n_records"]), (len(buffer) - offset) // BINARY_LOG_RECORD.itemsize)
+            records = np.frombuffer(buffer, dtype=BINARY_LOG_RECORD, count=n_records, offset=offset)
+            offset += records.nbytes
+            batches.append(pd.DataFrame({
+                "timestamp": (records["start_ns"] + (int(header["wall_ns"]) - int(header["monotonic_ns"]) +
+                        int(header["utc_offset"]) * 1000000000)).astype("datetime64[ns]"),
+                "method": np.array(BINARY_LOG_METHODS)[records["method"]],
+                "url": np.array(BINARY_LOG_PATH_TEMPLATES)[records["path_template"]],
+                "request_id": records["request_id"].astype(str),
+                "status_code": records["status_code"].astype(int),
+                "latency": records["latency_us"] / 1e6,
+                "type": np.array(BINARY_LOG_REQUEST_TYPES)[records["type"]],
+                "lag": records["lag_us"] / 1e6,
+            }))
+        if not batches:
+            return pd.DataFrame(columns=COLUMNS)
+        df = pd.concat(batches, ignore_index=True)
+        df["timestamp"] = df["timestamp"].dt.floor("ms")
+        df["latency"] = df["latency"].round(3)
+        df["status"] = np.where(df["status_code"] == 200, "successful", "failed")
+        df["rw"] = np.where(df["method"] == "GET", "read", "write")
+        df["lag"] = df["lag"].round(3)
+        df["corrected_latency"] = (df["latency"] + df["lag"]).round(3)
+        return df[COLUMNS]
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate CSV file")
-    parser.add_argument("--log_filepath", required=True, action="store",
-            type=str, help="Path to log file (input)")
-    parser.add_argument("--csv_filepath", required=True, action="store",
-            type=str, help="Path to CSV file (output)")
-    args = parser.parse_args()
-    with open(args.log_filepath) as logfile:
-        LoadgenParser.df(logfile).to_csv(args.csv_filepath, index=False)
+    import driver
+    args = driver.parse_args(driver.argument_parser(
+            workers_help="Number of processes parsing chunks of the log file (text logs only)"))
+    with open(args.log_filepath, "rb") as logfile:
+        if LoadgenParser.is_binary_log(logfile):
+            df = LoadgenParser.binary_df(logfile)
+        else:
+            df = driver.df(LoadgenParser, args.log_filepath, args.workers)
+    driver.write(df, DTYPES, args.csv_filepath, args.parquet_filepath)
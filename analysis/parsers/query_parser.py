@@ -1,28 +1,63 @@
 # Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
 # Systems
 
-import argparse
+import hashlib
 import re
 
 import pandas as pd
 
 # Constants
-COLUMNS = ["timestamp", "request_id", "dbname", "type", "latency"]
+COLUMNS = ["timestamp", "request_id", "dbname", "type", "latency", "fingerprint"]
+DTYPES = {"timestamp": "datetime64[ns]", "request_id": "object", "dbname": "category", "type": "category",
+        "latency": "float32", "fingerprint": "category"}
 QUERY_LOG_PATTERN = r"^\[(.+)\] pid=(.+) tid=(.+) request_id=(.+) latency=(.+) query=\"(.+)\"$"
+# Queries are fingerprinted by replacing their literals with placeholders ('?'), collapsing lists of placeholders, and
+# normalizing whitespace. Fingerprint ids are hashes of normalized queries, so that they are the same across nodes.
+FINGERPRINT_COLUMNS = ["fingerprint", "dbname", "type", "query"]
+LITERAL_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\b([Ii][Nn]) ?\( ?\?(?: ?, ?\?)* ?\)"), r"\1 (?)"),
+    (re.compile(r"(\( ?\?(?: ?, ?\?)* ?\))(?: ?, ?\1)+"), r"\1"),
+]
 
 
 class QueryParser:
+    # Normalized query to (fingerprint id, dbname, type).
+    _fingerprints = {}
+
     @classmethod
     def df(cls, logfile):
+        """Parse a query log. Besides `COLUMNS`, the data frame has column `query` with the normalized query of every
+        fingerprint (see `fingerprint_df`)."""
         data = [cls.extract_values_from_log(log) for log in logfile]
-        return pd.DataFrame(data=[d for d in data if d], columns=COLUMNS)
+        df = pd.DataFrame(data=[d for d in data if d], columns=COLUMNS + ["query"])
+        df["query"] = df["query"].astype("category")
+        return df
 
-    @staticmethod
-    def extract_values_from_log(log):
+    @classmethod
+    def extract_values_from_log(cls, log):
         match = re.match(QUERY_LOG_PATTERN, log)
         if not match:
             return None
         timestamp, _, _, request_id, latency, query_str = match.groups()
+        query = cls.normalize(query_str)
+        if query not in cls._fingerprints:
+            cls._fingerprints[query] = (hashlib.md5(query.encode("utf-8")).hexdigest()[:16], *cls.classify(query))
+        fingerprint, dbname, query_type = cls._fingerprints[query]
+        return (timestamp, request_id, dbname, query_type, latency, fingerprint, query)
+
+    @staticmethod
+    def normalize(query_str):
+        """Replace the literals of a query with placeholders."""
+        for (pattern, replacement) in LITERAL_PATTERNS:
+            query_str = pattern.sub(replacement, query_str)
+        return query_str.strip()
+
+    @staticmethod
+    def classify(query_str):
+        """Return the database name (i.e., table) and type of a query."""
         query_type = query_str.strip().split()[0].upper()
         if query_type == "SELECT":
             dbname = re.findall(r"[Ff][Rr][Oo][Mm]\s+(\w+)", query_str)[0]
@@ -32,15 +67,34 @@ class QueryParser:
             dbname = re.findall(r"[Uu][Pp][Dd][Aa][Tt][Ee]\s+(\w+)", query_str)[0]
         elif query_type == "DELETE":
             dbname = re.findall(r"[Ff][Rr][Oo][Mm]\s+(\w+)", query_str)[0]
-        return (timestamp, request_id, dbname, query_type, latency)
+        return (dbname, query_type)
+
+    @staticmethod
+    def fingerprint_df(df):
+        """Dictionary of the fingerprints of a parsed query log: a row per fingerprint with its normalized query."""
+        return df[FINGERPRINT_COLUMNS].drop_duplicates("fingerprint").astype(str).reset_index(drop=True)
+
+    @staticmethod
+    def latency_summary(df, by=("fingerprint",), percentiles=(50, 99)):
+        """Number of queries, latency percentiles (in seconds), and total latency of queries grouped by `by`, from the
+        largest total latency. With a fingerprint dictionary (see `fingerprint_df`) merged into `df`, `by` can also
+        include `query`."""
+        by = list(by)
+        latency = df["latency"].astype(float).groupby([df[column].astype(str) for column in by])
+        summary = latency.size().rename("count").to_frame()
+        for p in percentiles:
+            summary["p%s" % p] = latency.quantile(p / 100)
+        summary["total_latency"] = latency.sum()
+        return summary.sort_values("total_latency", ascending=False).reset_index()
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate CSV file")
-    parser.add_argument("--log_filepath", required=True, action="store",
-            type=str, help="Path to log file (input)")
-    parser.add_argument("--csv_filepath", required=True, action="store",
-            type=str, help="Path to CSV file (output)")
-    args = parser.parse_args()
-    with open(args.log_filepath) as logfile:
-        QueryParser.df(logfile).to_csv(args.csv_filepath, index=False)
+    import driver
+    parser = driver.argument_parser()
+    parser.add_argument("--fingerprints_filepath", required=False, default="", action="store",
+            type=str, help="Path to CSV file of query fingerprints (output)")
+    args = driver.parse_args(parser)
+    df = driver.df(QueryParser, args.log_filepath, args.workers)
+    driver.write(df[COLUMNS], DTYPES, args.csv_filepath, args.parquet_filepath)
+    if args.fingerprints_filepath:
+        QueryParser.fingerprint_df(df).to_csv(args.fingerprints_filepath, index=False)
@@ -1,13 +1,14 @@
 # Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
 # Systems
 
-import argparse
 import re
 
 import pandas as pd
 
 # Constants
 COLUMNS = ["timestamp", "request_id", "server", "function", "latency"]
+DTYPES = {"timestamp": "datetime64[ns]", "request_id": "object", "server": "category", "function": "category",
+        "latency": "float32"}
 RPC_LOG_PATTERN = r"^\[(.+)\] pid=(.+) tid=(.+) request_id=(.+) server=(.+) function=(.+) latency=(.+)$"
 
 
@@ -27,11 +28,7 @@ class RPCParser:
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate CSV file")
-    parser.add_argument("--log_filepath", required=True, action="store",
-            type=str, help="Path to log file (input)")
-    parser.add_argument("--csv_filepath", required=True, action="store",
-            type=str, help="Path to CSV file (output)")
-    args = parser.parse_args()
-    with open(args.log_filepath) as logfile:
-        RPCParser.df(logfile).to_csv(args.csv_filepath, index=False)
+    import driver
+    args = driver.parse_args(driver.argument_parser())
+    driver.write(driver.df(RPCParser, args.log_filepath, args.workers), DTYPES, args.csv_filepath,
+            args.parquet_filepath)
@@ -0,0 +1,175 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Parse log files while they are written.
+
+Log files are polled for new lines, which are parsed in batches of about `--batch_size` lines (or every
+`--flush_interval` seconds) and appended to CSV or Parquet files named after the log files (e.g., `loadgen.log` is
+parsed to `loadgen.csv`), like those generated by the parser scripts. Lines are parsed only once they are complete.
+Log files that do not exist yet are followed from when they are created, and log files that are rotated (i.e., renamed
+and recreated) or truncated are followed from the beginning of their new content. Truncation is detected by the last
+bytes read being overwritten, even if the new content is already longer than the previous one.
+
+On SIGTERM or SIGINT, the remaining lines (including an unterminated last line) are parsed and output files are
+closed, so that parsing ends shortly after logging does."""
+
+import argparse
+import importlib
+import os
+import signal
+import time
+
+import pandas as pd
+
+import driver
+
+# Constants
+# Parser names to parser modules and classes.
+PARSERS = {
+    "loadgen": ("loadgen_parser", "LoadgenParser"),
+    "query": ("query_parser", "QueryParser"),
+    "redis": ("redis_parser", "RedisParser"),
+    "rpc": ("rpc_parser", "RPCParser"),
+    "tcplistenbl": ("tcplistenbl_parser", "TcplistenblParser"),
+    "tcpretrans": ("tcpretrans_parser", "TcpretransParser"),
+}
+# Number of last bytes read from a log file that are compared to detect truncation.
+LAST_BYTES = 64
+
+
+class LogFollower:
+    """Follow a log file, returning its complete lines as they are written."""
+
+    def __init__(self, log_filepath):
+        self._log_filepath = log_filepath
+        self._logfile = None
+        self._partial_line = b""
+        self._last_bytes = b""
+
+    def read(self, final=False):
+        """Read the lines written since the last call. If `final`, an unterminated last line is also returned."""
+        lines = []
+        while True:
+            if self._logfile is None:
+                try:
+                    self._logfile = open(self._log_filepath, "rb")
+                except FileNotFoundError:
+                    break
+            if self._is_truncated():
+                self._logfile.seek(0)
+                self._partial_line = b""
+                self._last_bytes = b""
+            self._read_logfile(lines)
+            try:
+                stat = os.stat(self._log_filepath)
+            except FileNotFoundError:
+                # Rotated, but not recreated yet.
+                break
+            if stat.st_ino != os.fstat(self._logfile.fileno()).st_ino:
+                # Rotated: lines written to the previous file until the new file was created are read, and the new
+                # file is read from its start.
+                self._close_logfile(lines)
+            else:
+                break
+        if final and self._logfile is not None:
+            self._close_logfile(lines)
+        return lines
+
+    def _is_truncated(self):
+        """Whether the file was truncated (and possibly written again) since the last read, i.e., whether the bytes
+        before the current offset are no longer the last bytes read."""
+        offset = self._logfile.tell()
+        return os.pread(self._logfile.fileno(), len(self._last_bytes), offset - len(self._last_bytes)) != \
+                self._last_bytes
+
+    def _read_logfile(self, lines):
+        data = self._logfile.read()
+        self._last_bytes = (self._last_bytes + data)[-LAST_BYTES:]
+        data = self._partial_line + data
+        end = data.rfind(b"\n") + 1
+        lines.extend(data[:end].decode("utf-8", errors="replace").splitlines(keepends=True))
+        self._partial_line = data[end:]
+
+    def _close_logfile(self, lines):
+        # The last line of a file that is no longer written is complete.
+        self._read_logfile(lines)
+        if self._partial_line:
+            lines.append(self._partial_line.decode("utf-8", errors="replace"))
+            self._partial_line = b""
+        self._logfile.close()
+        self._logfile = None
+        self._last_bytes = b""
+
+
+class TailParser:
+    """Parse the lines of a followed log file with `parser.df`, and append them to output files in batches."""
+
+    def __init__(self, log_filepath, parser, dtypes, csv_filepath="", parquet_filepath="", fingerprints_filepath="",
+            batch_size=1 << 16, flush_interval=10.0):
+        self._follower = LogFollower(log_filepath)
+        self._parser = parser
+        self._columns = list(dtypes)
+        self._appender = driver.Appender(dtypes, csv_filepath, parquet_filepath)
+        self._fingerprints_filepath = fingerprints_filepath
+        self._fingerprint_dfs = []
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._lines = []
+        self._flush_time = time.monotonic()
+
+    def poll(self, final=False):
+        self._lines.extend(self._follower.read(final))
+        if final or len(self._lines) >= self._batch_size or \
+                (self._lines and time.monotonic() - self._flush_time >= self._flush_interval):
+            self.flush()
+
+    def flush(self):
+        df = self._parser.df(self._lines)
+        self._lines = []
+        self._flush_time = time.monotonic()
+        if self._fingerprints_filepath and len(df):
+            self._fingerprint_dfs.append(self._parser.fingerprint_df(df))
+        self._appender.append(df[self._columns])
+
+    def close(self):
+        self.poll(final=True)
+        self._appender.close()
+        if self._fingerprints_filepath:
+            pd.concat(self._fingerprint_dfs or [self._parser.fingerprint_df(self._parser.df([]))]).\
+                    drop_duplicates("fingerprint").to_csv(self._fingerprints_filepath, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate CSV or Parquet files while log files are written")
+    parser.add_argument("--follow", required=True, action="append", nargs=2, metavar=("LOG_FILEPATH", "PARSER"),
+            type=str, help="Path to log file (input) and name of its parser (%s)" % ", ".join(PARSERS))
+    parser.add_argument("--parsed_log_format", required=False, default="csv", action="store",
+            type=str, choices=["csv", "parquet"], help="Format of output files")
+    parser.add_argument("--batch_size", required=False, default=1 << 16, action="store",
+            type=int, help="Number of lines parsed and appended to output files at once")
+    parser.add_argument("--flush_interval", required=False, default=10.0, action="store",
+            type=float, help="Maximum number of seconds between appends to output files")
+    parser.add_argument("--poll_interval", required=False, default=1.0, action="store",
+            type=float, help="Number of seconds between reads of log files")
+    args = parser.parse_args()
+    tail_parsers = []
+    for (log_filepath, parser_name) in args.follow:
+        if parser_name not in PARSERS:
+            parser.error("unknown parser '%s'" % parser_name)
+        module = importlib.import_module(PARSERS[parser_name][0])
+        output_filepath = os.path.splitext(log_filepath)[0] + "." + args.parsed_log_format
+        tail_parsers.append(TailParser(log_filepath, getattr(module, PARSERS[parser_name][1]), module.DTYPES,
+                csv_filepath=output_filepath if args.parsed_log_format == "csv" else "",
+                parquet_filepath=output_filepath if args.parsed_log_format == "parquet" else "",
+                fingerprints_filepath=os.path.splitext(log_filepath)[0] + ".fingerprints.csv"
+                    if parser_name == "query" else "",
+                batch_size=args.batch_size, flush_interval=args.flush_interval))
+    stopping = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: stopping.append(signum))
+    while not stopping:
+        for tail_parser in tail_parsers:
+            tail_parser.poll()
+        time.sleep(args.poll_interval)
+    for tail_parser in tail_parsers:
+        tail_parser.close()
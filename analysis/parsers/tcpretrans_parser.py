@@ -1,13 +1,13 @@
 # Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
 # Systems
 
-import argparse
 import re
 
 import pandas as pd
 
 # Constants
 COLUMNS = ["timestamp", "pid", "addr", "port", "state"]
+DTYPES = {"timestamp": "datetime64[ns]", "pid": "int32", "addr": "category", "port": "int32", "state": "category"}
 TCPRETRANS_LOG_PATTERN = r"^([0-9\.\-\:]+)\s+(\d+)\s+([^:]+):([^\s]+)\s+([^:]+):([^\s]+)\s+(.+)$"
 
 
@@ -27,11 +27,7 @@ class TcpretransParser:
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate CSV file")
-    parser.add_argument("--log_filepath", required=True, action="store",
-            type=str, help="Path to log file (input)")
-    parser.add_argument("--csv_filepath", required=True, action="store",
-            type=str, help="Path to CSV file (output)")
-    args = parser.parse_args()
-    with open(args.log_filepath) as logfile:
-        TcpretransParser.df(logfile).to_csv(args.csv_filepath, index=False)
+    import driver
+    args = driver.parse_args(driver.argument_parser())
+    driver.write(driver.df(TcpretransParser, args.log_filepath, args.workers), DTYPES, args.csv_filepath,
+            args.parquet_filepath)
@@ -0,0 +1,37 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.breakdown import attribute_batch
+
+
+def test_nested_spans():
+    # A span [5, 60) that contains a span [10, 50), in a request [0, 100).
+    (span_requests, span_times, residues) = attribute_batch(np.array([0]), np.array([100]), np.array([5, 10]),
+            np.array([60, 50]), np.array([0, 2]))
+    assert span_requests.tolist() == [0, 0]
+    assert span_times.tolist() == [15, 40]
+    assert residues.tolist() == [45]
+
+
+def test_identical_spans():
+    # Two identical spans [10, 50) contained by a span [5, 60), and two identical spans [70, 80) (e.g., parallel RPCs
+    # that started and ended at the same times), in a request [0, 100).
+    (_, span_times, residues) = attribute_batch(np.array([0]), np.array([100]), np.array([5, 10, 10, 70, 70]),
+            np.array([60, 50, 50, 80, 80]), np.array([0, 5]))
+    assert span_times.tolist() == [15, 20, 20, 5, 5]
+    assert residues.tolist() == [35]
+
+
+def test_identical_spans_of_several_requests():
+    # Identical spans of different requests are not ties.
+    (span_requests, span_times, residues) = attribute_batch(np.array([0, 0]), np.array([100, 100]),
+            np.array([10, 10, 10]), np.array([50, 50, 50]), np.array([0, 2, 3]))
+    assert span_requests.tolist() == [0, 0, 1]
+    assert span_times.tolist() == [20, 20, 40]
+    assert residues.tolist() == [60, 60]
@@ -0,0 +1,44 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.concurrency import concurrency
+
+# Constants
+# Times are multiples of a quarter of a window, so that concurrency is constant between consecutive quarters.
+QUARTERS_PER_WINDOW = 4
+
+
+def brute_force(starts, ends, threshold):
+    """Maximum and mean concurrency in excess of `threshold` of spans [`starts[i]`, `ends[i]`) (in quarters of
+    windows) in every window from the first start to the last end."""
+    quarters = np.arange(starts.min() // QUARTERS_PER_WINDOW * QUARTERS_PER_WINDOW,
+            (ends.max() - 1) // QUARTERS_PER_WINDOW * QUARTERS_PER_WINDOW + QUARTERS_PER_WINDOW)
+    levels = np.maximum(((starts <= quarters[:, np.newaxis]) & (quarters[:, np.newaxis] < ends)).sum(axis=1) -
+            threshold, 0).reshape(-1, QUARTERS_PER_WINDOW)
+    return (levels.max(axis=1), levels.mean(axis=1))
+
+
+@pytest.mark.parametrize("threshold", [0, 1, 2])
+def test_spans_on_window_bounds(threshold):
+    rng = np.random.default_rng(threshold)
+    for _ in range(200):
+        # Spans start and end on window bounds or between them, and last at least a quarter of a window.
+        starts = rng.integers(0, 40, 8)
+        ends = starts + rng.integers(1, 12, 8)
+        (maximums, means) = brute_force(starts, ends, threshold)
+        (starts, ends) = (starts / QUARTERS_PER_WINDOW / 1000, ends / QUARTERS_PER_WINDOW / 1000)
+        assert concurrency(starts, ends, window_in_ms=1, threshold=threshold).tolist() == maximums.tolist()
+        assert np.allclose(concurrency(starts, ends, window_in_ms=1, threshold=threshold, statistic="mean"), means)
+
+
+def test_span_that_ends_on_window_bound():
+    starts = np.array([4, 3]) / 1000
+    ends = np.array([6, 8]) / 1000
+    assert concurrency(starts, ends, window_in_ms=1, threshold=1).tolist() == [0, 1, 1, 0, 0]
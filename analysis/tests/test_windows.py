@@ -0,0 +1,35 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from utils.windows import aggregate
+
+
+def test_timestamp_bounds():
+    df = pd.DataFrame({"timestamp": pd.to_datetime(["2022-01-01 00:00:01.5", "2022-01-01 00:00:02.5"])})
+    result = aggregate(df, min_time=pd.Timestamp("2022-01-01 00:00:00"),
+            max_time=pd.Timestamp("2022-01-01 00:00:03"))
+    assert list(result.index) == list(pd.date_range("2022-01-01 00:00:00", periods=4, freq="s"))
+    assert result["count"].tolist() == [0, 1, 1, 0]
+
+
+def test_empty_input_with_timestamp_bounds():
+    df = pd.DataFrame({"timestamp": pd.to_datetime([])})
+    result = aggregate(df, min_time=pd.Timestamp("2022-01-01 00:00:00"),
+            max_time=pd.Timestamp("2022-01-01 00:00:01"))
+    assert isinstance(result.index, pd.DatetimeIndex)
+    assert result["count"].tolist() == [0, 0]
+
+
+def test_missing_keys():
+    # Events with missing keys are dropped, rather than counted under another key.
+    df = pd.DataFrame({"time": [0.5, 0.5, 0.5, 1.5], "type": ["a", None, "b", "b"], "node": ["x", "x", np.nan, "x"]})
+    result = aggregate(df, time_column="time", key_columns=["type", "node"])
+    assert list(result["count"].columns) == [("a", "x"), ("b", "x")]
+    assert result["count"].to_numpy().tolist() == [[1, 0], [0, 1]]
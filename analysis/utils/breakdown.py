@@ -0,0 +1,149 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Latency breakdown of requests into the time of their RPCs, queries, and Redis commands.
+
+Spans of a request (see `traces.TraceStore`) are intervals that start at their timestamps and last their latencies,
+clipped to the interval of the request. The interval of a request is split at the start and end of each of its spans,
+and every part is attributed to the innermost spans active in it, i.e., the spans that do not contain any other active
+span (e.g., a query rather than the RPC that made it). Parts with concurrent innermost spans (e.g., parallel RPCs) are
+split evenly among them, and parts without any span are the residue of the request (e.g., time in the client or the
+network). Hence, the times attributed to the spans of a request and its residue add up to its latency.
+
+All requests are processed in batches with NumPy operations over their spans."""
+
+import numpy as np
+import pandas as pd
+
+# Constants
+BREAKDOWN_COLUMNS = ["source", "server", "operation"]
+RESIDUE = "residue"
+
+
+def expand_ranges(starts, ends):
+    """Concatenation of the ranges [`starts[i]`, `ends[i]`)."""
+    lengths = ends - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+def attribute_batch(request_starts, request_ends, span_starts, span_ends, span_offsets):
+    """Attribute the time of a batch of requests to their spans. Times are integers (e.g., ns). Spans of request `i`
+    are `span_starts[span_offsets[i]:span_offsets[i + 1]]`. Return the request (index in the batch), span, and
+    attributed time of every span, and the residue of every request."""
+    n_requests = len(request_starts)
+    span_requests = np.repeat(np.arange(n_requests), np.diff(span_offsets))
+    clipped_starts = np.clip(span_starts, request_starts[span_requests], request_ends[span_requests])
+    clipped_ends = np.clip(span_ends, request_starts[span_requests], request_ends[span_requests])
+    spans = np.flatnonzero(clipped_starts < clipped_ends)
+    # Points where intervals of requests are split, sorted by request and time, without duplicates.
+    point_requests = np.concatenate([np.arange(n_requests), np.arange(n_requests), span_requests[spans],
+            span_requests[spans]])
+    points = np.concatenate([request_starts, request_ends, clipped_starts[spans], clipped_ends[spans]])
+    order = np.lexsort((points, point_requests))
+    is_new = np.ones(len(points), dtype=bool)
+    is_new[1:] = (point_requests[order][1:] != point_requests[order][:-1]) | \
+            (points[order][1:] != points[order][:-1])
+    point_ids = np.empty(len(points), dtype=np.int64)
+    point_ids[order] = np.cumsum(is_new) - 1
+    unique_points = points[order][is_new]
+    unique_point_requests = point_requests[order][is_new]
+    # Part `j` of a request is between its points `j` and `j + 1`.
+    part_durations = np.diff(unique_points)
+    part_requests = unique_point_requests[:-1]
+    is_part = unique_point_requests[1:] == unique_point_requests[:-1]
+    # Parts that every span is active in, sorted by part and from the latest start (and earliest end) of spans.
+    # Spans that end before every span before them in a part are the innermost.
+    span_ranks = np.empty(len(spans), dtype=np.int64)
+    span_ranks[np.lexsort((span_ends[spans], -span_starts[spans]))] = np.arange(len(spans))
+    span_first_parts = point_ids[2 * n_requests:2 * n_requests + len(spans)]
+    span_last_parts = point_ids[2 * n_requests + len(spans):]
+    active_spans = np.repeat(np.arange(len(spans)), span_last_parts - span_first_parts)
+    active_parts = expand_ranges(span_first_parts, span_last_parts)
+    order = np.argsort(active_parts * len(spans) + span_ranks[active_spans])
+    active_spans = active_spans[order]
+    active_parts = active_parts[order]
+    # Ends are replaced by their ranks, shifted so that a cumulative minimum does not cross parts.
+    (_, end_ranks) = np.unique(span_ends[spans], return_inverse=True)
+    shifted_ends = end_ranks[active_spans] - active_parts * (len(spans) + 1)
+    is_first = np.ones(len(active_parts), dtype=bool)
+    is_first[1:] = active_parts[1:] != active_parts[:-1]
+    previous_min_ends = np.empty(len(active_parts), dtype=np.int64)
+    previous_min_ends[1:] = np.minimum.accumulate(shifted_ends)[:-1]
+    is_innermost = is_first | (previous_min_ends > shifted_ends)
+    # Spans with identical intervals are consecutive, and are all innermost if the first of them is.
+    is_tie = np.zeros(len(active_parts), dtype=bool)
+    is_tie[1:] = ~is_first[1:] & (span_starts[spans][active_spans[1:]] == span_starts[spans][active_spans[:-1]]) & \
+            (span_ends[spans][active_spans[1:]] == span_ends[spans][active_spans[:-1]])
+    is_innermost = is_innermost[np.maximum.accumulate(np.where(is_tie, 0, np.arange(len(active_parts))))]
+    n_innermost = np.bincount(active_parts, weights=is_innermost, minlength=len(part_durations))
+    times = np.where(is_innermost, part_durations[active_parts] / np.maximum(n_innermost[active_parts], 1), 0)
+    span_times = np.zeros(len(span_starts))
+    span_times[spans] = np.bincount(active_spans, weights=times, minlength=len(spans))
+    is_residue = is_part & (np.bincount(active_parts, minlength=len(part_durations)) == 0)
+    residues = np.bincount(part_requests[is_residue], weights=part_durations[is_residue], minlength=n_requests)
+    return (span_requests, span_times, residues)
+
+
+def attribute(store, batch_size=1 << 16):
+    """Attribute the latency of every request of a trace store to its spans and residue. Return a data frame with a
+    row per span of a request, with columns `request` and `span` (positions in `store.requests` and `store.spans`) and
+    `time` (in seconds), and the residue (in seconds) of every request."""
+    span_starts = store.spans["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    span_ends = span_starts + np.round(store.spans["latency"].to_numpy(dtype=np.float64) * 1e9).astype(np.int64)
+    request_starts = store.requests["timestamp"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    request_ends = request_starts + \
+            np.round(store.requests["latency"].to_numpy(dtype=np.float64) * 1e9).astype(np.int64)
+    first_spans = store.requests["span_start"].to_numpy(dtype=np.int64)
+    last_spans = store.requests["span_end"].to_numpy(dtype=np.int64)
+    attributions = []
+    residues = []
+    for first in range(0, len(store.requests), batch_size):
+        batch = slice(first, first + batch_size)
+        spans = expand_ranges(first_spans[batch], last_spans[batch])
+        (span_requests, span_times, batch_residues) = attribute_batch(request_starts[batch], request_ends[batch],
+                span_starts[spans], span_ends[spans],
+                np.concatenate([[0], np.cumsum(last_spans[batch] - first_spans[batch])]))
+        attributions.append(pd.DataFrame({"request": span_requests + first, "span": spans, "time": span_times / 1e9}))
+        residues.append(batch_residues / 1e9)
+    if not attributions:
+        return (pd.DataFrame(columns=["request", "span", "time"]), np.zeros(0))
+    return (pd.concat(attributions, ignore_index=True), np.concatenate(residues))
+
+
+def latency_buckets(requests, percentiles=(50, 90, 99)):
+    """Latency percentile bucket of every request among requests of its type (e.g., "p90-p99")."""
+    edges = [0] + list(percentiles) + [100]
+    labels = ["p%s-p%s" % (low, high) for (low, high) in zip(edges[:-1], edges[1:])]
+    ranks = requests.groupby(requests["type"].astype(str))["latency"].rank(method="first", pct=True)
+    return pd.Categorical.from_codes(np.searchsorted(np.array(percentiles) / 100, ranks.to_numpy(), side="left"),
+            labels)
+
+
+def breakdown(store, percentiles=(50, 90, 99), batch_size=1 << 16):
+    """Mean time per request (in seconds) attributed to every source (rpc, query, or redis), server (or database), and
+    operation (function, query type, or command), and to residue, by type of requests and latency percentile bucket
+    (see `latency_buckets`). Column `share` is the fraction of the mean latency of the requests of the bucket."""
+    (attribution, residues) = attribute(store, batch_size)
+    requests = pd.DataFrame({"type": pd.Categorical(store.requests["type"].astype(str)),
+            "bucket": latency_buckets(store.requests, percentiles),
+            "latency": store.requests["latency"].to_numpy(dtype=np.float64)})
+    span_requests = requests.iloc[attribution["request"].to_numpy(dtype=np.int64)].reset_index(drop=True)
+    spans = store.spans.iloc[attribution["span"].to_numpy(dtype=np.int64)].reset_index(drop=True)
+    # Times are summed by categories, whose strings are only compared once per group.
+    span_times = pd.DataFrame({"type": span_requests["type"], "bucket": span_requests["bucket"],
+            **{column: spans[column].astype("category") for column in BREAKDOWN_COLUMNS},
+            "time": attribution["time"].to_numpy()}).\
+            groupby(["type", "bucket"] + BREAKDOWN_COLUMNS, observed=True)["time"].sum().reset_index()
+    residue_times = requests.assign(time=residues).groupby(["type", "bucket"], observed=True)["time"].sum().\
+            reset_index().assign(source=RESIDUE, server="", operation="")
+    summary = pd.concat([span_times.astype({column: str for column in ["type", "bucket"] + BREAKDOWN_COLUMNS}),
+            residue_times.astype({"type": str, "bucket": str})], ignore_index=True)
+    buckets = requests.groupby(["type", "bucket"], observed=True)["latency"].agg(["size", "mean"]).reset_index().\
+            astype({"type": str, "bucket": str})
+    summary = summary.merge(buckets, on=["type", "bucket"])
+    summary["time"] /= summary["size"]
+    summary["share"] = summary["time"] / summary["mean"]
+    summary = summary.rename(columns={"size": "requests", "mean": "latency"})
+    return summary.sort_values(["type", "bucket", "time"], ascending=[True, True, False]).reset_index(drop=True)[
+            ["type", "bucket"] + BREAKDOWN_COLUMNS + ["requests", "latency", "time", "share"]]
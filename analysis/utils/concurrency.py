@@ -0,0 +1,101 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Concurrency (e.g., number of connections to a server) and queue length of spans of time, in windows.
+
+Starts and ends of spans (e.g., RPCs, queries, or TCP sessions) are sorted as events that increment and decrement the
+concurrency of their keys (e.g., servers), whose cumulative sum is the exact concurrency between consecutive events.
+Concurrency in a window is then summarized from the events in it and the concurrency at its start, so that memory is
+linear in the number of spans and windows, whatever their durations:
+
+    concurrency(rpc["timestamp"], rpc["timestamp"] + rpc["latency"], rpc["server"], window_in_ms=1)
+    queue_length(query["timestamp"], query["timestamp"] + query["latency"] / 1000, PG_MAX_CONNECTIONS, query["dbname"],
+            window_in_ms=1)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Constants
+STATISTICS = ("max", "mean", "overlap")
+
+
+def to_ns(times):
+    """Times (in seconds, or timestamps) in nanoseconds."""
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        return times.astype("datetime64[ns]").view(np.int64)
+    return np.round(times.astype(np.float64) * 1e9).astype(np.int64)
+
+
+def key_concurrency(starts, ends, bounds, window_ns, threshold, statistic):
+    """Concurrency of spans [`starts[i]`, `ends[i]`) (in ns) in windows [`bounds[j]`, `bounds[j + 1]`), in excess of
+    `threshold`."""
+    n_windows = len(bounds) - 1
+    if statistic == "overlap":
+        # Spans that overlap a window started in or before it, and did not end before it.
+        first_windows = (starts - bounds[0]) // window_ns
+        last_windows = (np.maximum(ends - 1, starts) - bounds[0]) // window_ns
+        counts = np.cumsum(np.bincount(first_windows, minlength=n_windows + 1)[:n_windows]) - \
+                np.cumsum(np.bincount(last_windows + 1, minlength=n_windows + 1)[:n_windows])
+        return np.maximum(counts - threshold, 0)
+    # Ends are sorted before starts at the same time, so that back-to-back spans do not overlap.
+    order = np.argsort(np.concatenate([starts * 2 + 1, ends * 2]))
+    times = np.concatenate([starts, ends])[order]
+    levels = np.maximum(np.cumsum(np.where(order < len(starts), 1, -1)) - threshold, 0)
+    # Concurrency before every event.
+    previous_levels = np.concatenate([[0], levels])
+    bound_events = np.searchsorted(times, bounds, side="left")
+    if statistic == "max":
+        # Concurrency at the start of every window is after all events at or before it.
+        result = previous_levels[np.searchsorted(times, bounds[:-1], side="right")]
+        # Events at the end of the last window only decrease concurrency.
+        n_events = bound_events[-1]
+        (event_windows, first_events) = np.unique((times[:n_events] - bounds[0]) // window_ns, return_index=True)
+        # Concurrency between events at the same time (e.g., ends of several spans) does not last.
+        is_last = np.append(times[1:] != times[:-1], True)[:n_events]
+        if n_events:
+            result[event_windows] = np.maximum(result[event_windows],
+                    np.maximum.reduceat(np.where(is_last, levels[:n_events], 0), first_events))
+        return result
+    # Integral of concurrency from the first event to every event, and to the start of every window.
+    integrals = np.concatenate([[0], np.cumsum(levels[:-1] * np.diff(times).astype(np.float64))])
+    previous_events = np.maximum(bound_events - 1, 0)
+    bound_integrals = np.where(bound_events > 0, integrals[previous_events] +
+            previous_levels[bound_events] * (bounds - times[previous_events]).astype(np.float64), 0)
+    return np.diff(bound_integrals) / window_ns
+
+
+def concurrency(starts, ends, keys=None, window_in_ms=1, threshold=0, statistic="max"):
+    """Concurrency of spans of time in windows, by key. Starts and ends are in seconds (e.g., since the start of the
+    experiment) or timestamps, and windows are numbered from time 0 (or the epoch). Statistics are the maximum ("max")
+    or time-weighted mean ("mean") of the exact concurrency in windows, or the number of spans that overlap windows
+    ("overlap"). With a `threshold` (e.g., `THRIFT_THREADS`), it is the concurrency in excess of it (see
+    `queue_length`). Return a data frame indexed by window, with a column per key, or a series if there are no keys."""
+    if statistic not in STATISTICS:
+        raise ValueError("unknown statistic '%s' (expected one of %s)" % (statistic, ", ".join(STATISTICS)))
+    window_ns = int(round(window_in_ms * 1e6))
+    starts = to_ns(starts)
+    ends = np.maximum(to_ns(ends), starts)
+    (key_codes, key_values) = pd.factorize(pd.Series(np.zeros(len(starts)) if keys is None else keys), sort=True)
+    if len(starts):
+        windows = pd.RangeIndex(starts.min() // window_ns, np.maximum(ends - 1, starts).max() // window_ns + 1,
+                name="window")
+    else:
+        windows = pd.RangeIndex(0, 0, name="window")
+    bounds = np.arange(windows.start, windows.stop + 1, dtype=np.int64) * window_ns
+    order = np.argsort(key_codes, kind="stable")
+    key_offsets = np.searchsorted(key_codes[order], np.arange(len(key_values) + 1))
+    df = pd.DataFrame(index=windows)
+    for (i, key) in enumerate(key_values):
+        spans = order[key_offsets[i]:key_offsets[i + 1]]
+        df[key] = key_concurrency(starts[spans], ends[spans], bounds, window_ns, threshold, statistic)
+    if keys is None:
+        return df[key_values[0]].rename(None) if len(key_values) else pd.Series(index=windows, dtype=np.float64)
+    return df
+
+
+def queue_length(starts, ends, threshold, keys=None, window_in_ms=1, statistic="max"):
+    """Queue length of spans of time in windows, by key, i.e., their concurrency in excess of `threshold` (e.g.,
+    `THRIFT_THREADS` or `PG_MAX_CONNECTIONS`). See `concurrency`."""
+    return concurrency(starts, ends, keys, window_in_ms, threshold, statistic)
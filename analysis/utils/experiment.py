@@ -0,0 +1,143 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Lazy tables of the parsed logs of an experiment.
+
+An `Experiment` has a `Table` per kind of log in `utils.LOGS` (e.g., `experiment.rpc` or `experiment.collectl_cpu`).
+Tables are filtered by time (`between`) and by values of columns (`where`), and their columns are selected (`select`)
+without reading anything. Their `df` method then reads only the cached Parquet files (see `utils.ingest`) of matching
+nodes and tarballs, the row groups of those files that overlap the time window, and the selected columns:
+
+    experiment = Experiment(experiment_dirpath)
+    rpc = experiment.rpc.between(600, 630).where(server="post:9090").select("timestamp", "latency").df()
+"""
+
+import numbers
+import os
+
+import pandas as pd
+
+from utils import utils
+
+
+class Table:
+    """A kind of parsed logs of an experiment, filtered by time and values of columns, and with selected columns."""
+
+    def __init__(self, experiment, kind, columns=None, min_time=None, max_time=None, values=None):
+        self._experiment = experiment
+        self._kind = kind
+        self._columns = columns
+        self._min_time = min_time
+        self._max_time = max_time
+        self._values = values or {}
+
+    def _replace(self, **kwargs):
+        return Table(**dict({"experiment": self._experiment, "kind": self._kind, "columns": self._columns,
+                "min_time": self._min_time, "max_time": self._max_time, "values": self._values}, **kwargs))
+
+    def select(self, *columns):
+        """Table with only `columns` (and `node_name`)."""
+        return self._replace(columns=list(columns))
+
+    def between(self, min_time=None, max_time=None):
+        """Table with only rows whose timestamps are in [`min_time`, `max_time`]. Times are in seconds since the start
+        of the experiment (like `MIN_TIME` and `MAX_TIME` of notebooks) or timestamps."""
+        return self._replace(min_time=self._experiment.timestamp(min_time),
+                max_time=self._experiment.timestamp(max_time))
+
+    def where(self, **values):
+        """Table with only rows whose columns have values (or one of lists of values), e.g.,
+        `where(node_name="node-1", function=["retrieve_post", "retrieve_account"])`. `node_name` and `tarball_name`
+        (e.g., "loadgen.tar.gz") select parsed logs without reading them."""
+        return self._replace(values=dict(self._values, **{column: value if isinstance(value, (list, tuple, set))
+                else [value] for (column, value) in values.items()}))
+
+    def parquet_files(self):
+        """Cached Parquet files of the table, as tuples of node name, tarball name, and path."""
+        experiment_dirpath = self._experiment.dirpath
+        for node_name in utils.get_node_names(experiment_dirpath):
+            if node_name not in self._values.get("node_name", [node_name]):
+                continue
+            for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
+                if tarball_name not in self._values.get("tarball_name", [tarball_name]) or \
+                        tarball_name != utils.LOGS[self._kind].get("tarball_name", tarball_name):
+                    continue
+                parquet_filepath = os.path.join(utils.ingest_tarball(experiment_dirpath, node_name, tarball_name),
+                        self._kind + ".parquet")
+                if os.path.exists(parquet_filepath):
+                    yield (node_name, tarball_name, parquet_filepath)
+
+    def df(self):
+        """Read the table into a data frame, with column `node_name`."""
+        values = {column: column_values for (column, column_values) in self._values.items()
+                if column not in ("node_name", "tarball_name")}
+        columns = None
+        if self._columns is not None:
+            # Columns that rows are filtered by are read, and dropped after filtering.
+            columns = [column for column in self._columns if column != "node_name"]
+            columns += [column for column in values if column not in columns]
+            if (self._min_time is not None or self._max_time is not None) and "timestamp" not in columns:
+                columns.append("timestamp")
+        filters = []
+        if self._min_time is not None:
+            filters.append(("timestamp", ">=", self._min_time))
+        if self._max_time is not None:
+            filters.append(("timestamp", "<=", self._max_time))
+        dfs = []
+        for (node_name, _, parquet_filepath) in self.parquet_files():
+            # Row groups outside of the time window are skipped.
+            df = pd.read_parquet(parquet_filepath, columns=columns, filters=filters or None)
+            mask = pd.Series(True, index=df.index)
+            if self._min_time is not None:
+                mask &= df["timestamp"] >= self._min_time
+            if self._max_time is not None:
+                mask &= df["timestamp"] <= self._max_time
+            for (column, column_values) in values.items():
+                mask &= df[column].isin(column_values)
+            df = df[mask]
+            if self._columns is not None:
+                df = df[[column for column in self._columns if column != "node_name"]]
+            dfs.append(df.assign(node_name=node_name))
+        if not dfs:
+            columns = self._columns if self._columns is not None else list(utils.LOGS[self._kind]["dtypes"] or [])
+            return pd.DataFrame(columns=[column for column in columns if column != "node_name"] + ["node_name"])
+        return pd.concat(dfs, ignore_index=True)
+
+
+class Experiment:
+    """An experiment, whose parsed logs are lazy tables named after their kinds (see `utils.LOGS`): `rpc`, `query`,
+    `query_fingerprint`, `redis`, `loadgen`, `loadgen_histogram`, `collectl_cpu`, `collectl_mem`, `collectl_dsk`,
+    `tcplistenbl`, `tcpretrans`, and `radvisor`."""
+
+    def __init__(self, experiment_dirpath):
+        self.dirpath = experiment_dirpath
+        self._summary = None
+
+    def __getattr__(self, kind):
+        if kind in utils.LOGS:
+            return Table(self, kind)
+        raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, kind))
+
+    @property
+    def summary(self):
+        """Summary of the experiment (see `utils.get_experiment_summary`)."""
+        if self._summary is None:
+            self._summary = utils.get_experiment_summary(self.dirpath)
+        return self._summary
+
+    @property
+    def start_time(self):
+        return pd.Timestamp(self.summary["start_time"])
+
+    @property
+    def end_time(self):
+        return pd.Timestamp(self.summary["end_time"])
+
+    def timestamp(self, time):
+        """Timestamp of a time in seconds since the start of the experiment (or of a timestamp)."""
+        if time is None or isinstance(time, pd.Timestamp):
+            return time
+        # Including NumPy numbers (e.g., values of data frames), but not booleans.
+        if isinstance(time, numbers.Real) and not isinstance(time, bool):
+            return self.start_time + pd.to_timedelta(time, unit="s")
+        return pd.Timestamp(time)
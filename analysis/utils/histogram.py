@@ -0,0 +1,68 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Constants
+# Must match `loadgen/histogram.py`.
+SUB_BUCKET_BITS = 7
+COLUMNS = ["timestamp", "type", "status_code", "interval", "bucket", "count"]
+HISTOGRAM_LOG_PATTERN = r"^\[(\d+\-\d+\-\d+ \d+:\d+:\d+.\d+)\] type=(\w+) status_code=(\d+) interval=(\d+.\d+) " \
+        r"counts=([\d:,]*)$"
+
+
+def parse_log(logfile):
+    """Parse a loadgen histogram log into a data frame with a row per non-empty bucket of each snapshot."""
+    data = []
+    for log in logfile:
+        if isinstance(log, bytes):
+            log = log.decode("utf-8")
+        match = re.match(HISTOGRAM_LOG_PATTERN, log.strip())
+        if not match:
+            continue
+        timestamp, type, status_code, interval, counts = match.groups()
+        for bucket_count in counts.split(','):
+            bucket, count = bucket_count.split(':')
+            data.append((timestamp, type, int(status_code), float(interval), int(bucket), int(count)))
+    snapshots = pd.DataFrame(data=data, columns=COLUMNS)
+    snapshots["timestamp"] = pd.to_datetime(snapshots["timestamp"])
+    return snapshots
+
+
+def bucket_lowest_value(bucket):
+    """Lowest latency (in seconds) of buckets."""
+    bucket = np.asarray(bucket)
+    shift = np.maximum((bucket >> (SUB_BUCKET_BITS - 1)) - 1, 0)
+    return ((bucket - (shift << (SUB_BUCKET_BITS - 1))) << shift) / 1e6
+
+
+def bucket_value(bucket):
+    """Latency (in seconds) that represents buckets (their midpoint)."""
+    bucket = np.asarray(bucket)
+    shift = np.maximum((bucket >> (SUB_BUCKET_BITS - 1)) - 1, 0)
+    return bucket_lowest_value(bucket) + ((1 << shift) - 1) / 2e6
+
+
+def merge(dfs, window="1s"):
+    """Merge histogram snapshots (e.g., of multiple loadgen containers and nodes) into windows of length `window`. A
+    snapshot belongs to the window its timestamp (the end of its interval) falls in."""
+    df = pd.concat(dfs, ignore_index=True)
+    df["timestamp"] = df["timestamp"].dt.floor(window)
+    return df.groupby(["timestamp", "type", "status_code", "bucket"], as_index=False)["count"].sum()
+
+
+def percentiles(df, percentiles=(50, 90, 99, 99.9), by=("timestamp", "type")):
+    """Compute latency percentiles (in seconds) of merged histograms, grouped by `by`. Percentiles are accurate to the
+    width of a bucket (1/64 of its value)."""
+    by = list(by)
+    df = df.groupby(by + ["bucket"], as_index=False)["count"].sum().sort_values(by + ["bucket"])
+    df["cumcount"] = df.groupby(by)["count"].cumsum()
+    total = df.groupby(by)["count"].transform("sum")
+    result = df.groupby(by)["count"].sum().rename("count").to_frame()
+    for p in percentiles:
+        rows = df[df["cumcount"] >= total * p / 100].groupby(by).head(1).set_index(by)
+        result["p%s" % p] = pd.Series(bucket_value(rows["bucket"].values), index=rows.index)
+    return result.reset_index()
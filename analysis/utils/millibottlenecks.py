@@ -0,0 +1,188 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Millibottlenecks, i.e., sub-second saturation of resources (e.g., CPU, disks, or listen backlogs of TCP sockets)
+during which long response time (LRT) requests are in flight.
+
+Samples of resources (collectl, rAdvisor, `tcplistenbl.bt`, and `tcpretrans.bt` logs) and requests (loadgen logs) are
+aggregated in the windows of a common grid of time, from the start to the end of the experiment (see
+`windows.aggregate`). Windows without samples of a resource (e.g., between samples of rAdvisor, or between ACK packets
+sampled by `tcplistenbl.bt`) take the value of the last window with samples, as of at most `tolerance_in_ms` before
+(see `align`). Consecutive windows where a resource is saturated while LRT requests are in flight are a
+millibottleneck, whose impact is the total latency of the LRT requests that overlap it:
+
+    millibottlenecks(Experiment(experiment_dirpath), window_in_ms=50, latency_threshold=1)
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import utils
+from utils.breakdown import expand_ranges
+from utils.concurrency import concurrency
+from utils.windows import aggregate
+
+# Constants
+# Saturation thresholds of resources: utilization of CPU cores (mean of a node), disks, and memory of NUMA nodes (%),
+# time that containers were throttled (%), length of listen backlogs of sockets (% of their maximum), and TCP
+# retransmissions (count).
+SATURATION_THRESHOLDS = {"cpu": 95, "dsk": 95, "mem": 95, "throttling": 10, "backlog": 100, "retrans": 1}
+# Latency of LRT requests (in sec).
+LATENCY_THRESHOLD = 1
+WINDOW_IN_MS = 50
+TOLERANCE_IN_MS = 100
+
+
+def read_samples(experiment, kind, columns, clock_offset=0):
+    """Data frames of the parsed logs of a kind of every node, with column `time` (in seconds since the start of the
+    experiment). Timestamps of logs are shifted by `clock_offset` seconds (e.g., of logs in local time)."""
+    for node_name in utils.get_node_names(experiment.dirpath):
+        df = getattr(experiment, kind).where(node_name=node_name).select("timestamp", *columns).df()
+        if len(df):
+            yield df.assign(time=(df["timestamp"] - experiment.start_time).dt.total_seconds() + clock_offset)
+
+
+def read_requests(experiment):
+    """Requests of loadgen logs, with columns `time` (in seconds since the start of the experiment) and `latency` (in
+    seconds)."""
+    df = experiment.loadgen.select("timestamp", "latency").df()
+    return pd.DataFrame({"time": (df["timestamp"].astype("datetime64[ns]") - experiment.start_time).dt.total_seconds(),
+            "latency": df["latency"].astype(np.float64)})
+
+
+def throttling_samples(dfs):
+    """Time that containers were throttled since their previous samples (% of time), of data frames of rAdvisor
+    logs."""
+    for df in dfs:
+        (codes, _) = pd.factorize(df["container_name"])
+        order = np.lexsort((df["read"].to_numpy(), codes))
+        (df, codes) = (df.take(order), codes[order])
+        reads = df["read"].to_numpy(dtype=np.float64)
+        throttled_times = df["cpu_throttling_throttled_time"].to_numpy(dtype=np.float64)
+        # The first sample of a container has no previous sample.
+        samples = np.flatnonzero(codes[1:] == codes[:-1]) + 1
+        values = np.full(len(df), np.nan)
+        values[samples] = 100 * (throttled_times[samples] - throttled_times[samples - 1]) / \
+                np.maximum(reads[samples] - reads[samples - 1], 1)
+        yield df.assign(device=df["container_name"], value=values)
+
+
+def align(df, tolerance):
+    """Values of every column of a data frame indexed by time (e.g., of `windows.aggregate`) as of every time, i.e.,
+    the last value (that is not NaN) at most `tolerance` before it."""
+    values = df.to_numpy(dtype=np.float64)
+    if not values.size:
+        return df
+    times = df.index.to_numpy(dtype=np.float64)
+    (rows, columns) = np.nonzero(~np.isnan(values))
+    samples = pd.DataFrame({"time": times[rows], "column": columns, "value": values[rows, columns]})
+    grid = pd.DataFrame({"time": np.repeat(times, values.shape[1]),
+            "column": np.tile(np.arange(values.shape[1]), len(times))})
+    aligned = pd.merge_asof(grid, samples, on="time", by="column", tolerance=tolerance)
+    return pd.DataFrame(aligned["value"].to_numpy().reshape(values.shape), index=df.index, columns=df.columns)
+
+
+def resource_signals(experiment, window_in_ms=WINDOW_IN_MS, tolerance_in_ms=TOLERANCE_IN_MS, clock_offsets=None):
+    """Samples of resources in windows from the start to the end of an experiment: mean utilization of the CPU cores of
+    every node (`cpu`), maximum utilization of every disk (`dsk`) and of the memory of every NUMA node (`mem`) (%),
+    maximum throttled time of every container (`throttling`, %), maximum length of the listen backlog of every command
+    (`backlog`, % of its maximum), and number of TCP retransmissions of every node (`retrans`). Timestamps of logs of a
+    kind (e.g., "tcplistenbl") are shifted by `clock_offsets[kind]` seconds. Return a data frame indexed by the start of
+    windows (in seconds), with a column per resource, node name, and device (e.g., `df["dsk"]["node-9"]["sda"]`)."""
+    clock_offsets = clock_offsets or {}
+    samples = lambda kind, columns: read_samples(experiment, kind, columns, clock_offsets.get(kind, 0))
+    # Resources, with the statistics that aggregate their samples in windows.
+    resources = {
+        "cpu": ("mean", (df.assign(device="", value=df["total"]) for df in samples("collectl_cpu", ["total"]))),
+        "dsk": ("max", (df.assign(device=df["name"], value=df["util"])
+                for df in samples("collectl_dsk", ["name", "util"]))),
+        "mem": ("max", (df.assign(device=df["hw_no"], value=100 * df["used"] / (df["used"] + df["free"]))
+                for df in samples("collectl_mem", ["hw_no", "used", "free"]))),
+        "throttling": ("max", throttling_samples(samples("radvisor", ["container_name", "read",
+                "cpu_throttling_throttled_time"]))),
+        "backlog": ("max", (df.assign(device=df["command"], value=100 * df["len"] / df["max"].where(df["max"] > 0))
+                for df in samples("tcplistenbl", ["command", "len", "max"]))),
+        "retrans": ("count", (df.assign(device="") for df in samples("tcpretrans", []))),
+    }
+    max_time = (experiment.end_time - experiment.start_time).total_seconds()
+    columns = ["resource", "node_name", "device"]
+    signals = []
+    for (resource, (statistic, dfs)) in resources.items():
+        df = aggregate(dfs, time_column="time", value_column=None if statistic == "count" else "value",
+                key_columns=["node_name", "device"], window_in_ms=window_in_ms, statistics=[statistic], min_time=0,
+                max_time=max_time)
+        # Resources without logs have no columns.
+        if not len(df.columns):
+            continue
+        df = df[statistic]
+        # Numbers of events are not sampled.
+        if statistic != "count":
+            df = align(df, tolerance_in_ms / 1000)
+        df.columns = pd.MultiIndex.from_tuples([(resource, node_name, str(device))
+                for (node_name, device) in df.columns], names=columns)
+        signals.append(df)
+    if not signals:
+        return pd.DataFrame(index=df.index, columns=pd.MultiIndex.from_tuples([], names=columns), dtype=np.float64)
+    return pd.concat(signals, axis=1)
+
+
+def latency_signals(requests, max_time, window_in_ms=WINDOW_IN_MS, latency_threshold=LATENCY_THRESHOLD):
+    """Requests (see `read_requests`) in windows from the start of an experiment to `max_time` (in seconds): number of
+    requests that started in them (`requests`), their maximum and 99th percentile latency (`max` and `p99`, in
+    seconds), and number of LRT requests (with latency of at least `latency_threshold` seconds) in flight (`lrt`)."""
+    df = aggregate(requests, time_column="time", value_column="latency", window_in_ms=window_in_ms,
+            statistics=["count", "max"], quantiles=[0.99], min_time=0, max_time=max_time)
+    lrt = requests[requests["latency"] >= latency_threshold]
+    in_flight = concurrency(lrt["time"], lrt["time"] + lrt["latency"], window_in_ms=window_in_ms, statistic="overlap")
+    # Windows of the grid and of `concurrency` are both numbered from time 0.
+    df["lrt"] = in_flight.reindex(np.arange(len(df)), fill_value=0).to_numpy(dtype=np.int64)
+    return df.rename(columns={"count": "requests"})
+
+
+def millibottlenecks(experiment, window_in_ms=WINDOW_IN_MS, latency_threshold=LATENCY_THRESHOLD,
+        saturation_thresholds=None, tolerance_in_ms=TOLERANCE_IN_MS, clock_offsets=None):
+    """Millibottlenecks of an experiment, i.e., consecutive windows where a resource (see `resource_signals`) is
+    saturated (at least at its threshold in `SATURATION_THRESHOLDS`, or in `saturation_thresholds`) while LRT requests
+    (with latency of at least `latency_threshold` seconds) are in flight. Return a data frame with a row per
+    millibottleneck, with its resource, node name, and device, start and end (in seconds since the start of the
+    experiment), duration, peak value, and number (`requests`) and total latency (`impact`, in seconds) of the LRT
+    requests that overlap it, ranked by impact."""
+    thresholds = dict(SATURATION_THRESHOLDS, **(saturation_thresholds or {}))
+    max_time = (experiment.end_time - experiment.start_time).total_seconds()
+    requests = read_requests(experiment)
+    latency = latency_signals(requests, max_time, window_in_ms, latency_threshold)
+    resources = resource_signals(experiment, window_in_ms, tolerance_in_ms, clock_offsets)
+    values = resources.to_numpy(dtype=np.float64)
+    is_saturated = values >= np.array([thresholds[resource]
+            for resource in resources.columns.get_level_values("resource")], dtype=np.float64)
+    is_coincident = is_saturated & (latency["lrt"].to_numpy() > 0)[:, np.newaxis]
+    # Runs of coincident windows [`starts[i]`, `ends[i]`) of every column, in order of columns and windows.
+    edges = np.diff(np.pad(is_coincident.T.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    (columns, starts) = np.nonzero(edges == 1)
+    (_, ends) = np.nonzero(edges == -1)
+    run_values = values.T.ravel()[expand_ranges(columns * len(resources) + starts, columns * len(resources) + ends)]
+    peaks = np.maximum.reduceat(run_values, np.cumsum(ends - starts) - (ends - starts)) if len(starts) else \
+            np.zeros(0)
+    (start_times, end_times) = (starts * window_in_ms / 1000, ends * window_in_ms / 1000)
+    # LRT requests that overlap a millibottleneck started before its end, and did not end before its start.
+    lrt = requests[requests["latency"] >= latency_threshold]
+    lrt_latencies = lrt["latency"].to_numpy()
+    (lrt_starts, lrt_ends) = (lrt["time"].to_numpy(), lrt["time"].to_numpy() + lrt_latencies)
+    (start_order, end_order) = (np.argsort(lrt_starts), np.argsort(lrt_ends))
+    n_started = np.searchsorted(lrt_starts[start_order], end_times, side="left")
+    n_ended = np.searchsorted(lrt_ends[end_order], start_times, side="right")
+    impacts = np.concatenate([[0], np.cumsum(lrt_latencies[start_order])])[n_started] - \
+            np.concatenate([[0], np.cumsum(lrt_latencies[end_order])])[n_ended]
+    keys = resources.columns[columns]
+    df = pd.DataFrame({
+        "resource": keys.get_level_values("resource"),
+        "node_name": keys.get_level_values("node_name"),
+        "device": keys.get_level_values("device"),
+        "start": start_times,
+        "end": end_times,
+        "duration": end_times - start_times,
+        "peak": peaks,
+        "requests": n_started - n_ended,
+        "impact": impacts,
+    })
+    return df.sort_values(["impact", "duration"], ascending=False).reset_index(drop=True)
@@ -0,0 +1,99 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Traces of requests, i.e., requests of loadgens with the RPCs, queries, and Redis commands that they caused.
+
+A `TraceStore` has a data frame of requests (a row per request of loadgen logs) and a data frame of spans (a row per
+RPC, query, or Redis command), sorted by request ID and timestamp. Spans of a request are a slice of the spans data
+frame, whose offsets are found by binary search on request IDs (`get_spans`) or stored with requests (`span_start` and
+`span_end`), so that traces are fetched without scanning logs. Trace stores are built once per experiment and stored
+in its cache (see `utils.ingest`)."""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from utils import utils
+from utils.experiment import Experiment
+
+# Constants
+# Kinds of logs of spans, with their columns of servers and operations.
+SPAN_LOGS = {
+    "rpc": ("server", "function"),
+    "query": ("dbname", "type"),
+    "redis": ("service_name", "command"),
+}
+SPAN_COLUMNS = ["request_id", "timestamp", "latency", "source", "server", "operation", "node_name"]
+
+
+class TraceStore:
+    """Requests (data frame `requests`) and their spans (data frame `spans`) of an experiment."""
+
+    def __init__(self, requests, spans):
+        self.requests = requests
+        self.spans = spans
+        self._request_ids = spans["request_id"].to_numpy()
+
+    @classmethod
+    def build(cls, experiment):
+        """Assemble the traces of the requests of an experiment."""
+        spans = []
+        for (kind, (server_column, operation_column)) in SPAN_LOGS.items():
+            df = getattr(experiment, kind).select("request_id", "timestamp", "latency", server_column,
+                    operation_column).df()
+            spans.append(pd.DataFrame({
+                "request_id": df["request_id"].astype(str),
+                "timestamp": df["timestamp"].astype("datetime64[ns]"),
+                "latency": df["latency"].astype("float32"),
+                "source": kind,
+                "server": df[server_column],
+                "operation": df[operation_column],
+                "node_name": df["node_name"],
+            }, columns=SPAN_COLUMNS))
+        spans = pd.concat([df for df in spans if len(df)] or spans[:1], ignore_index=True)
+        # Sorting request IDs by their codes is faster than sorting them as strings.
+        (request_id_codes, _) = pd.factorize(spans["request_id"], sort=True)
+        spans = spans.take(np.lexsort((spans["timestamp"].to_numpy(), request_id_codes))).reset_index(drop=True)
+        spans = spans.astype({"source": "category", "server": "category", "operation": "category",
+                "node_name": "category"})
+        requests = experiment.loadgen.df()
+        request_ids = spans["request_id"].to_numpy()
+        requests["span_start"] = np.searchsorted(request_ids, requests["request_id"].astype(str).to_numpy(),
+                side="left")
+        requests["span_end"] = np.searchsorted(request_ids, requests["request_id"].astype(str).to_numpy(),
+                side="right")
+        return cls(requests, spans)
+
+    def get_spans(self, request_id):
+        """Spans of a request, in order of their timestamps."""
+        return self.spans.iloc[np.searchsorted(self._request_ids, request_id, side="left"):
+                np.searchsorted(self._request_ids, request_id, side="right")]
+
+    def get_trace(self, request):
+        """Spans of a request (a row of `requests`, e.g., of `requests.itertuples()` or `requests.to_dict("records")`),
+        in order of their timestamps."""
+        if isinstance(request, dict):
+            return self.spans.iloc[request["span_start"]:request["span_end"]]
+        return self.spans.iloc[request.span_start:request.span_end]
+
+
+def get_trace_store(experiment_dirpath):
+    """Trace store of an experiment, built once and stored in its cache. It is built again if tarballs changed."""
+    tarball_versions = utils.get_experiment_summary(experiment_dirpath)["tarball_versions"]
+    stores_dirpath = os.path.join(experiment_dirpath, utils.CACHE_DIRNAME, "traces")
+    store_dirpath = os.path.join(stores_dirpath,
+            hashlib.md5(yaml.dump(tarball_versions).encode("utf-8")).hexdigest())
+    if os.path.isdir(store_dirpath):
+        return TraceStore(pd.read_parquet(os.path.join(store_dirpath, "requests.parquet")),
+                pd.read_parquet(os.path.join(store_dirpath, "spans.parquet")))
+    store = TraceStore.build(Experiment(experiment_dirpath))
+    tmp_store_dirpath = "%s.%d.tmp" % (store_dirpath, os.getpid())
+    os.makedirs(tmp_store_dirpath, exist_ok=True)
+    store.requests.to_parquet(os.path.join(tmp_store_dirpath, "requests.parquet"), index=False)
+    store.spans.to_parquet(os.path.join(tmp_store_dirpath, "spans.parquet"), index=False)
+    # Trace stores of previous versions of tarballs are replaced.
+    utils.replace_cache_entry(tmp_store_dirpath, store_dirpath)
+    return store
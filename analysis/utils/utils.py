@@ -2,13 +2,101 @@
 # Systems
 
 import gzip
+import io
 import os
 import pandas as pd
+import shutil
 import sys
 import tarfile
+import yaml
 
 sys.path.append(os.path.abspath(os.path.join("..")))
-from parsers import collectl_parser, loadgen_parser, query_parser, redis_parser, rpc_parser, tcplistenbl_parser, tcpretrans_parser
+from parsers import collectl_parser, driver, loadgen_parser, query_parser, redis_parser, rpc_parser, tcplistenbl_parser, tcpretrans_parser
+from notebooks.lib import radvisor_parser
+from utils import histogram
+
+
+# Logs of experiments are parsed once into a cache (see `ingest`), directory `CACHE_DIRNAME` of experiments. Parsed
+# logs of a tarball are stored as Parquet files (a file per kind of log in `LOGS`) in a directory named after the
+# version of the cache and the size and modification time of the tarball, so that entries of tarballs that changed, or
+# of previous versions of parsers, are not used.
+CACHE_DIRNAME = ".cache"
+# Version of cache entries, to be increased whenever parsed logs change (e.g., columns or dtypes of parsers).
+CACHE_VERSION = 2
+# Parquet files of the cache are split into row groups of this many rows, whose time ranges let readers skip them (see
+# `experiment.Table`).
+CACHE_ROW_GROUP_SIZE = 1 << 17
+# Kinds of logs, with the suffixes of parsed log files (of which the first found is read) and of log files (of which
+# all files with the first suffix found are parsed), in order of preference, the dtypes of parsed logs, and the tarball
+# that they are in (if not any).
+LOGS = {
+    "rpc": {
+        "parsed": ["calls.parquet", "calls.csv"],
+        "logs": [("calls.log", lambda logfile: rpc_parser.RPCParser.df(text(logfile)))],
+        "dtypes": rpc_parser.DTYPES,
+    },
+    "query": {
+        "parsed": ["queries.parquet", "queries.csv"],
+        "logs": [("queries.log", lambda logfile: query_parser.QueryParser.df(text(logfile)))],
+        "dtypes": query_parser.DTYPES,
+    },
+    "query_fingerprint": {
+        "parsed": ["queries.fingerprints.csv"],
+        "logs": [],
+        # Fingerprints are derived from queries parsed from logs, rather than parsed from them again.
+        "derived_from": ("query", query_parser.QueryParser.fingerprint_df),
+        "dtypes": None,
+    },
+    "redis": {
+        "parsed": ["redis.parquet", "redis.csv"],
+        "logs": [("redis.log", lambda logfile: redis_parser.RedisParser.df(text(logfile)))],
+        "dtypes": redis_parser.DTYPES,
+    },
+    "loadgen": {
+        "parsed": ["loadgen.parquet", "loadgen.csv"],
+        "logs": [("loadgen.bin", loadgen_parser.LoadgenParser.binary_df),
+                ("loadgen.log", lambda logfile: loadgen_parser.LoadgenParser.df(text(logfile)))],
+        "dtypes": loadgen_parser.DTYPES,
+    },
+    "loadgen_histogram": {
+        "parsed": [],
+        "logs": [("loadgen.hist", histogram.parse_log)],
+        "dtypes": None,
+    },
+    "collectl_cpu": {
+        "parsed": [".cpu.parquet", ".cpu.csv"],
+        "logs": [(".cpu.gz", lambda logfile: collectl_parser.CollectlParser.df(gzip.open(logfile, "rt"), "cpu"))],
+        "dtypes": collectl_parser.DTYPES["cpu"],
+    },
+    "collectl_mem": {
+        "parsed": [".numa.parquet", ".numa.csv"],
+        "logs": [(".numa.gz", lambda logfile: collectl_parser.CollectlParser.df(gzip.open(logfile, "rt"), "mem"))],
+        "dtypes": collectl_parser.DTYPES["mem"],
+    },
+    "collectl_dsk": {
+        "parsed": [".dsk.parquet", ".dsk.csv"],
+        "logs": [(".dsk.gz", lambda logfile: collectl_parser.CollectlParser.df(gzip.open(logfile, "rt"), "dsk"))],
+        "dtypes": collectl_parser.DTYPES["dsk"],
+    },
+    "tcplistenbl": {
+        "parsed": ["./log.parquet", "./log.csv"],
+        "logs": [("./log", lambda logfile: tcplistenbl_parser.TcplistenblParser.df(text(logfile)))],
+        "dtypes": tcplistenbl_parser.DTYPES,
+        "tarball_name": "tcplistenbl-bpftrace.tar.gz",
+    },
+    "tcpretrans": {
+        "parsed": ["./log.parquet", "./log.csv"],
+        "logs": [("./log", lambda logfile: tcpretrans_parser.TcpretransParser.df(text(logfile)))],
+        "dtypes": tcpretrans_parser.DTYPES,
+        "tarball_name": "tcpretrans-bpftrace.tar.gz",
+    },
+    "radvisor": {
+        "parsed": [],
+        "logs": [(".log", lambda logfile: parse_radvisor_log(text(logfile)))],
+        "dtypes": None,
+        "tarball_name": "radvisor.tar.gz",
+    },
+}
 
 
 def get_node_names(experiment_dirpath):
@@ -17,174 +105,280 @@ def get_node_names(experiment_dirpath):
             if not dirname.startswith('.')]
 
 
-def get_rpc_df(experiment_dirpath):
-    for node_name in get_node_names(experiment_dirpath):
-        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith("calls.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
+def text(logfile):
+    """Text stream of a log file extracted from a tarball."""
+    return io.TextIOWrapper(logfile, encoding="utf-8")
+
+
+def parse_radvisor_log(logfile):
+    """Parse an rAdvisor target log into a data frame with a row per sample of the container, like
+    `radvisor_parser.load_target_log` (without per-CPU usage), with columns `container_id`, `container_name`, and
+    `timestamp` (the time of the sample)."""
+    df, _, metadata = radvisor_parser.load_target_log(logfile)
+    # Unlimited number of PIDs ("max") and limits are mixed.
+    df["pids_max"] = df["pids_max"].astype(str)
+    df.insert(0, "timestamp", pd.to_datetime(df["read"], unit="ns"))
+    df.insert(0, "container_name", metadata["Metadata"]["Names"][0].lstrip('/'))
+    df.insert(0, "container_id", metadata["Metadata"]["Id"])
+    return df
+
+
+def read_parsed_log(parsed_logfile, filename, parse_dates=("timestamp",)):
+    """Read a parsed log file (Parquet or CSV) extracted from a tarball."""
+    if filename.endswith(".parquet"):
+        # Parquet readers seek back and forth, which is slow on members of compressed tarballs.
+        return pd.read_parquet(io.BytesIO(parsed_logfile.read()))
+    return pd.read_csv(parsed_logfile, parse_dates=list(parse_dates))
+
+
+def tarball_version(tarball_path):
+    """Version of the cache entry of a tarball (see `CACHE_VERSION`)."""
+    tarball_stat = os.stat(tarball_path)
+    return "%d-%d-%d" % (CACHE_VERSION, tarball_stat.st_size, tarball_stat.st_mtime_ns)
+
+
+def replace_cache_entry(tmp_entry_dirpath, entry_dirpath):
+    """Move a cache entry from a temporary directory to its directory, replacing entries of other versions. If another
+    process moved the same entry first (e.g., while ingesting the same tarball), it is kept."""
+    entries_dirpath = os.path.dirname(entry_dirpath)
+    for dirname in os.listdir(entries_dirpath):
+        if not dirname.endswith(".tmp") and dirname != os.path.basename(entry_dirpath):
+            shutil.rmtree(os.path.join(entries_dirpath, dirname), ignore_errors=True)
+    try:
+        os.rename(tmp_entry_dirpath, entry_dirpath)
+    except OSError:
+        if not os.path.isdir(entry_dirpath):
+            raise
+        shutil.rmtree(tmp_entry_dirpath)
+
+
+def ingest_tarball(experiment_dirpath, node_name, tarball_name):
+    """Parse all kinds of logs in a tarball into its cache entry, unless it is cached already. Return the path to the
+    cache entry."""
+    tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
+    entry_dirpath = os.path.join(experiment_dirpath, CACHE_DIRNAME, node_name, tarball_name,
+            tarball_version(tarball_path))
+    if os.path.isdir(entry_dirpath):
+        return entry_dirpath
+    # Members of the tarball to be read, with the kinds of logs and functions that read them.
+    readers = {}
+    dfs = {}
+    # Kinds of logs parsed from log files, rather than read from parsed log files.
+    parsed_kinds = set()
+    with tarfile.open(tarball_path, "r:gz") as tar:
+        members = [member for member in tar.getmembers() if member.isfile()]
+        for (kind, log) in LOGS.items():
+            if log.get("tarball_name", tarball_name) != tarball_name:
+                continue
+            for filename_suffix in log["parsed"]:
+                matches = [member for member in members if member.name.endswith(filename_suffix)]
+                if matches:
+                    readers.setdefault(matches[0], []).append((kind, lambda logfile, filename=matches[0].name,
+                            parse_dates=("timestamp",) if log["dtypes"] else ():
+                            read_parsed_log(logfile, filename, parse_dates)))
+                    break
+            else:
+                for (filename_suffix, parse) in log["logs"]:
+                    matches = [member for member in members if member.name.endswith(filename_suffix)]
+                    for member in matches:
+                        readers.setdefault(member, []).append((kind, parse))
+                    if matches:
+                        parsed_kinds.add(kind)
+                        break
+        # Members are read in the order that they are in the tarball, so that it is decompressed only once more.
+        for member in sorted(readers, key=lambda member: member.offset_data):
+            with tar.extractfile(member) as logfile:
+                if len(readers[member]) == 1:
+                    (kind, read) = readers[member][0]
+                    dfs.setdefault(kind, []).append(read(logfile))
                 else:
-                    for filename in tar.getnames():
-                        if filename.endswith("calls.log"):
-                            with tar.extractfile(filename) as logfile:
-                                yield (node_name, tarball_name,
-                                        rpc_parser.RPCParser.df(logfile).assign(node_name=node_name))
+                    data = logfile.read()
+                    for (kind, read) in readers[member]:
+                        dfs.setdefault(kind, []).append(read(io.BytesIO(data)))
+    for (kind, log) in LOGS.items():
+        if "derived_from" in log and kind not in dfs and log["derived_from"][0] in parsed_kinds:
+            (source_kind, derive) = log["derived_from"]
+            dfs[kind] = [derive(pd.concat(dfs[source_kind], ignore_index=True))]
+    tmp_entry_dirpath = "%s.%d.tmp" % (entry_dirpath, os.getpid())
+    os.makedirs(tmp_entry_dirpath, exist_ok=True)
+    for (kind, kind_dfs) in dfs.items():
+        df = pd.concat(kind_dfs, ignore_index=True)
+        if LOGS[kind]["dtypes"]:
+            df = driver.typed(df, LOGS[kind]["dtypes"])
+        df.to_parquet(os.path.join(tmp_entry_dirpath, kind + ".parquet"), index=False,
+                row_group_size=CACHE_ROW_GROUP_SIZE)
+    replace_cache_entry(tmp_entry_dirpath, entry_dirpath)
+    return entry_dirpath
 
 
-def get_query_df(experiment_dirpath):
+def ingest(experiment_dirpath):
+    """Parse all kinds of logs (`LOGS`) in all tarballs of an experiment into its cache, reading each tarball once.
+    Tarballs that are cached already and did not change are skipped. `get_*_df` functions ingest tarballs as needed,
+    so calling this function first is optional."""
     for node_name in get_node_names(experiment_dirpath):
         for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith("queries.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
-                else:
-                    for filename in tar.getnames():
-                        if filename.endswith("queries.log"):
-                            with tar.extractfile(filename) as logfile:
-                                yield (node_name, tarball_name,
-                                        query_parser.QueryParser.df(logfile).assign(node_name=node_name))
+            ingest_tarball(experiment_dirpath, node_name, tarball_name)
 
 
-def get_redis_df(experiment_dirpath):
+def get_cached_df(experiment_dirpath, kind):
+    """Parsed logs of a kind (see `LOGS`), as tuples of node name, tarball name, and data frame."""
     for node_name in get_node_names(experiment_dirpath):
-        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith("redis.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
-                else:
-                    for filename in tar.getnames():
-                        if filename.endswith("redis.log"):
-                            with tar.extractfile(filename) as logfile:
-                                yield (node_name, tarball_name,
-                                        redis_parser.RedisParser.df(logfile).assign(node_name=node_name))
+        for tarball_name in [LOGS[kind]["tarball_name"]] if "tarball_name" in LOGS[kind] else \
+                os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
+            if not os.path.exists(os.path.join(experiment_dirpath, "logs", node_name, tarball_name)):
+                continue
+            parquet_filepath = os.path.join(ingest_tarball(experiment_dirpath, node_name, tarball_name),
+                    kind + ".parquet")
+            if os.path.exists(parquet_filepath):
+                yield (node_name, tarball_name, pd.read_parquet(parquet_filepath).assign(node_name=node_name))
+
+
+def get_rpc_df(experiment_dirpath):
+    yield from get_cached_df(experiment_dirpath, "rpc")
+
+
+def get_query_df(experiment_dirpath):
+    yield from get_cached_df(experiment_dirpath, "query")
+
+
+def get_query_fingerprint_df(experiment_dirpath):
+    yield from get_cached_df(experiment_dirpath, "query_fingerprint")
+
+
+def get_redis_df(experiment_dirpath):
+    yield from get_cached_df(experiment_dirpath, "redis")
 
 
 def get_loadgen_df(experiment_dirpath):
-    for node_name in get_node_names(experiment_dirpath):
-        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith("loadgen.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
-                else:
-                    for filename in tar.getnames():
-                        if filename.endswith("loadgen.log"):
-                            with tar.extractfile(filename) as logfile:
-                                yield (node_name, tarball_name,
-                                        loadgen_parser.LoadgenParser.df(logfile).assign(node_name=node_name))
+    yield from get_cached_df(experiment_dirpath, "loadgen")
+
+
+def get_loadgen_histogram_df(experiment_dirpath):
+    yield from get_cached_df(experiment_dirpath, "loadgen_histogram")
 
 
 def get_collectl_cpu_df(experiment_dirpath):
-    for node_name in get_node_names(experiment_dirpath):
-        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith(".cpu.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
-                else:
-                    for filename in tar.getnames():
-                        if filename.endswith(".cpu.gz"):
-                            with gzip.open(tar.extractfile(filename), "rt") as logfile:
-                                yield (node_name, tarball_name,
-                                        collectl_parser.CollectlParser.df(logfile, "cpu").assign(node_name=node_name))
+    yield from get_cached_df(experiment_dirpath, "collectl_cpu")
 
 
 def get_collectl_mem_df(experiment_dirpath):
-    for node_name in get_node_names(experiment_dirpath):
-        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith(".numa.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
-                else:
-                    for filename in tar.getnames():
-                        if filename.endswith(".numa.gz"):
-                            with gzip.open(tar.extractfile(filename), "rt") as logfile:
-                                yield (node_name, tarball_name,
-                                        collectl_parser.CollectlParser.df(logfile, "mem").assign(node_name=node_name))
+    yield from get_cached_df(experiment_dirpath, "collectl_mem")
 
 
 def get_collectl_dsk_df(experiment_dirpath):
-    for node_name in get_node_names(experiment_dirpath):
-        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                for filename in tar.getnames():
-                    if filename.endswith(".dsk.csv"):
-                        with tar.extractfile(filename) as csvfile:
-                            yield (node_name, tarball_name,
-                                    pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                            break
-                else:
-                    for filename in tar.getnames():
-                        if filename.endswith(".dsk.gz"):
-                            with gzip.open(tar.extractfile(filename), "rt") as logfile:
-                                yield (node_name, tarball_name,
-                                        collectl_parser.CollectlParser.df(logfile, "dsk").assign(node_name=node_name))
+    yield from get_cached_df(experiment_dirpath, "collectl_dsk")
 
 
 def get_tcplistenbl_df(experiment_dirpath):
-    tarball_name = "tcplistenbl-bpftrace.tar.gz"
-    for node_name in get_node_names(experiment_dirpath):
-        if tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                if "./log.csv" in tar.getnames():
-                    with tar.extractfile("./log.csv") as csvfile:
-                        yield (node_name, tarball_name,
-                                pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                elif "./log" in tar.getnames():
-                    with tar.extractfile("./log") as logfile:
-                        yield (node_name, tarball_name, tcplistenbl_parser.TcplistenblParser.df(logfile).assign(node_name=node_name))
+    yield from get_cached_df(experiment_dirpath, "tcplistenbl")
 
 
 def get_tcpretrans_df(experiment_dirpath):
-    tarball_name = "tcpretrans-bpftrace.tar.gz"
+    yield from get_cached_df(experiment_dirpath, "tcpretrans")
+
+
+def get_tarball_summary(experiment_dirpath, node_name, tarball_name):
+    """Summary of the parsed logs of a tarball: for every kind of log, its number of rows and time range, and for every
+    type of requests of loadgen logs, their numbers and total latency (in seconds). It is computed from cached parsed
+    logs, and stored with them."""
+    entry_dirpath = ingest_tarball(experiment_dirpath, node_name, tarball_name)
+    summary_filepath = os.path.join(entry_dirpath, "summary.yml")
+    if os.path.exists(summary_filepath):
+        with open(summary_filepath) as summary_file:
+            return yaml.load(summary_file, Loader=yaml.Loader)
+    summary = {"logs": {}, "request_types": {}}
+    for kind in LOGS:
+        parquet_filepath = os.path.join(entry_dirpath, kind + ".parquet")
+        if not os.path.exists(parquet_filepath):
+            continue
+        if kind == "loadgen":
+            df = pd.read_parquet(parquet_filepath, columns=["timestamp", "status", "type", "latency"])
+            requests = df.assign(failed=(df["status"] == "failed")).groupby(df["type"].astype(str))
+            summary["request_types"] = {
+                request_type: {"count": int(count), "failed": int(failed), "latency": float(latency)}
+                for (request_type, count, failed, latency) in zip(requests.size().index, requests.size(),
+                    requests["failed"].sum(), requests["latency"].sum())}
+        elif kind == "loadgen_histogram":
+            df = pd.read_parquet(parquet_filepath, columns=["timestamp", "interval"])
+            # Snapshots cover the interval that ends at their timestamp.
+            df = df.assign(start_time=df["timestamp"] - pd.to_timedelta(df["interval"], unit="s"))
+        elif LOGS[kind]["dtypes"]:
+            df = pd.read_parquet(parquet_filepath, columns=["timestamp"])
+        else:
+            df = pd.read_parquet(parquet_filepath)
+        summary["logs"][kind] = {"rows": len(df)}
+        if "timestamp" in df and df["timestamp"].notna().any():
+            summary["logs"][kind]["start_time"] = str(df.get("start_time", df["timestamp"]).min())
+            summary["logs"][kind]["end_time"] = str(df["timestamp"].max())
+    with open(summary_filepath, 'w') as summary_file:
+        summary_file.write(yaml.dump(summary))
+    return summary
+
+
+def get_experiment_summary(experiment_dirpath):
+    """Summary of the parsed logs of an experiment (see `get_tarball_summary`), aggregated by node, tarball, kind of
+    log, and type of requests, with the start and end times of the experiment. It is stored next to `metadata.yml`,
+    and computed again only if tarballs changed."""
+    summary_filepath = os.path.join(experiment_dirpath, "summary.yml")
+    tarball_versions = {}
     for node_name in get_node_names(experiment_dirpath):
-        if tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
-            tarball_path = os.path.join(experiment_dirpath, "logs", node_name, tarball_name)
-            with tarfile.open(tarball_path, "r:gz") as tar:
-                if "./log.csv" in tar.getnames():
-                    with tar.extractfile("./log.csv") as csvfile:
-                        yield (node_name, tarball_name,
-                                pd.read_csv(csvfile, parse_dates=["timestamp"]).assign(node_name=node_name))
-                elif "./log" in tar.getnames():
-                    with tar.extractfile("./log") as logfile:
-                        yield (node_name, tarball_name, tcpretrans_parser.TcpretransParser.df(logfile).assign(node_name=node_name))
+        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
+            tarball_versions[os.path.join(node_name, tarball_name)] = \
+                    tarball_version(os.path.join(experiment_dirpath, "logs", node_name, tarball_name))
+    if os.path.exists(summary_filepath):
+        with open(summary_filepath) as summary_file:
+            summary = yaml.load(summary_file, Loader=yaml.Loader)
+        if summary.get("tarball_versions") == tarball_versions:
+            return summary
+    summary = {"tarball_versions": tarball_versions, "nodes": {}, "logs": {}, "request_types": {}}
+    for node_name in get_node_names(experiment_dirpath):
+        summary["nodes"][node_name] = {"tarballs": {}}
+        for tarball_name in os.listdir(os.path.join(experiment_dirpath, "logs", node_name)):
+            tarball_summary = get_tarball_summary(experiment_dirpath, node_name, tarball_name)
+            times = [log[key] for log in tarball_summary["logs"].values() for key in ("start_time", "end_time")
+                    if key in log]
+            summary["nodes"][node_name]["tarballs"][tarball_name] = {
+                "start_time": min(times) if times else None,
+                "end_time": max(times) if times else None,
+                "logs": {kind: log["rows"] for (kind, log) in tarball_summary["logs"].items()},
+            }
+            for (kind, log) in tarball_summary["logs"].items():
+                kind_summary = summary["logs"].setdefault(kind, {"rows": 0})
+                kind_summary["rows"] += log["rows"]
+                if "start_time" in log:
+                    kind_summary["start_time"] = min(kind_summary.get("start_time", log["start_time"]),
+                            log["start_time"])
+                    kind_summary["end_time"] = max(kind_summary.get("end_time", log["end_time"]), log["end_time"])
+            for (request_type, requests) in tarball_summary["request_types"].items():
+                request_type_summary = summary["request_types"].setdefault(request_type,
+                        {"count": 0, "failed": 0, "latency": 0.0})
+                for (key, value) in requests.items():
+                    request_type_summary[key] += value
+        times = [tarball[key] for tarball in summary["nodes"][node_name]["tarballs"].values()
+                for key in ("start_time", "end_time") if tarball[key]]
+        summary["nodes"][node_name]["start_time"] = min(times) if times else None
+        summary["nodes"][node_name]["end_time"] = max(times) if times else None
+    # The experiment spans the requests of loadgens or, if loadgens ran without request logs, their histogram
+    # snapshots. Without either, it spans all logs.
+    for kind in ("loadgen", "loadgen_histogram"):
+        if "start_time" in summary["logs"].get(kind, {}):
+            summary["start_time"] = summary["logs"][kind]["start_time"]
+            summary["end_time"] = summary["logs"][kind]["end_time"]
+            break
+    else:
+        times = [node[key] for node in summary["nodes"].values() for key in ("start_time", "end_time") if node[key]]
+        summary["start_time"] = min(times) if times else None
+        summary["end_time"] = max(times) if times else None
+    with open(summary_filepath, 'w') as summary_file:
+        summary_file.write(yaml.dump(summary))
+    return summary
 
 
 def get_experiment_start_time(experiment_dirpath):
-    requests = pd.concat([df[2] for df in get_loadgen_df(experiment_dirpath)])
-    return requests["timestamp"].values.min()
+    start_time = pd.Timestamp(get_experiment_summary(experiment_dirpath)["start_time"])
+    return start_time.to_datetime64().astype("datetime64[ns]")
 
 
 def get_experiment_end_time(experiment_dirpath):
-    requests = pd.concat([df[2] for df in get_loadgen_df(experiment_dirpath)])
-    return requests["timestamp"].values.max()
+    end_time = pd.Timestamp(get_experiment_summary(experiment_dirpath)["end_time"])
+    return end_time.to_datetime64().astype("datetime64[ns]")
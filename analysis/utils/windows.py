@@ -0,0 +1,244 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Aggregation of events (e.g., requests, RPCs, or samples) in fixed windows of time, by key.
+
+Events are assigned to windows by integer division of their times in nanoseconds, and aggregated by window and key
+with sorts and reductions over all events at once. Data frames are processed in chunks (or are given as an iterable of
+chunks, e.g., the data frames of a generator), whose partial aggregates are merged, so that only aggregates are kept in
+memory. Quantiles are estimated from counts of values in logarithmic buckets, with a bounded relative error, unless
+they are exact (`quantile_accuracy=None`), which keeps all values in memory. Results are dense (windows without events
+have a count of 0) and aligned across keys:
+
+    df = aggregate(rpc, value_column="latency", key_columns=["function"], window_in_ms=1000,
+            statistics=["count", "max"], quantiles=[0.99])
+    df["p99"]["retrieve_post"]
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.concurrency import to_ns
+
+# Constants
+STATISTICS = ("count", "throughput", "sum", "mean", "min", "max")
+# Relative error of estimated quantiles.
+QUANTILE_ACCURACY = 0.01
+# Number of rows of data frames aggregated at once.
+CHUNK_SIZE = 1 << 22
+# Bucket of values that are not positive.
+NON_POSITIVE_BUCKET = -(1 << 20)
+
+
+def reduce_by(keys, sums=(), mins=(), maxs=()):
+    """Sums, minimums, and maximums of arrays by unique combination of keys (arrays of integers). Return the unique
+    combinations of keys, sorted, and the reductions."""
+    # Keys are sorted at once if their ranges fit in a single integer.
+    (combined_keys, size) = (np.zeros(len(keys[0]), dtype=np.int64), 1)
+    for key in keys[::-1]:
+        (low, high) = (key.min(), key.max()) if len(key) else (0, 0)
+        if size * (int(high) - int(low) + 1) >= 1 << 62:
+            order = np.lexsort(keys[::-1])
+            break
+        combined_keys += (key - low) * size
+        size *= int(high) - int(low) + 1
+    else:
+        order = np.argsort(combined_keys)
+    keys = [key[order] for key in keys]
+    starts = group_starts(keys)
+    reduce = lambda ufunc, x: ufunc.reduceat(x[order], starts) if len(starts) else x[:0]
+    return ([key[starts] for key in keys], [reduce(np.add, x) for x in sums], [reduce(np.minimum, x) for x in mins],
+            [reduce(np.maximum, x) for x in maxs])
+
+
+def group_starts(keys):
+    """Starts of groups of rows with equal keys (sorted arrays of integers)."""
+    is_new = np.zeros(len(keys[0]), dtype=bool)
+    is_new[:1] = True
+    for key in keys:
+        is_new[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(is_new)
+
+
+def concatenate(partials):
+    """Concatenation of partial aggregates (see `reduce_by`)."""
+    return tuple([np.concatenate(x) for x in zip(*arrays)] for arrays in zip(*partials))
+
+
+def quantile_column(quantile):
+    """Column name of a quantile, e.g., "p99" for 0.99 and "p99.9" for 0.999."""
+    return "p%s" % ("%f" % (quantile * 100)).rstrip("0").rstrip(".")
+
+
+def is_timestamp(time):
+    """Whether a time is a timestamp (rather than in seconds)."""
+    return isinstance(time, (datetime.datetime, np.datetime64))
+
+
+def time_to_ns(time):
+    """A time (in seconds, or a timestamp) in nanoseconds."""
+    return pd.to_datetime(time).value if is_timestamp(time) else int(round(float(time) * 1e9))
+
+
+def chunks(dfs, chunk_size):
+    """Data frames of at most `chunk_size` rows of a data frame or of an iterable of data frames."""
+    if isinstance(dfs, pd.DataFrame):
+        dfs = [dfs]
+    for df in dfs:
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def aggregate(dfs, time_column="timestamp", value_column=None, key_columns=(), window_in_ms=1000,
+        statistics=("count",), quantiles=(), quantile_accuracy=QUANTILE_ACCURACY, min_time=None, max_time=None,
+        chunk_size=CHUNK_SIZE):
+    """Aggregate events of a data frame (or of an iterable of data frames) in windows, by values of `key_columns`.
+    Times are in seconds (e.g., since the start of the experiment) or timestamps. Statistics (see `STATISTICS`) other
+    than "count" and "throughput" (per second), and quantiles (e.g., 0.99), are of `value_column`. Windows are from
+    `min_time` (or the first event) to `max_time` (or the last event). Return a data frame indexed by the start of
+    windows (in seconds, or timestamps), with a column per statistic (and quantile, e.g., "p99"), or, if there are key
+    columns, a column per statistic and key (e.g., `df["count"]["retrieve_post"]`)."""
+    for statistic in statistics:
+        if statistic not in STATISTICS:
+            raise ValueError("unknown statistic '%s' (expected one of %s)" % (statistic, ", ".join(STATISTICS)))
+    if value_column is None and (quantiles or set(statistics) - {"count", "throughput"}):
+        raise ValueError("statistics of values and quantiles require a value column")
+    window_ns = int(round(window_in_ms * 1e6))
+    key_columns = list(key_columns)
+    log_gamma = np.log((1 + quantile_accuracy) / (1 - quantile_accuracy)) if quantile_accuracy else None
+    # Without events, times are timestamps if bounds are.
+    is_datetime = any(is_timestamp(time) for time in (min_time, max_time))
+    # Codes of keys, in order of appearance. Without key columns, events (if any) have the same key.
+    key_codes = {} if key_columns else {None: 0}
+    (partials, quantile_partials) = ([], [])
+    for df in chunks(dfs, chunk_size):
+        is_datetime = np.issubdtype(df[time_column].dtype, np.datetime64)
+        windows = to_ns(df[time_column]) // window_ns
+        if key_columns:
+            # Key columns are factorized one by one, and their codes combined, which is faster than factorizing tuples.
+            factorized = [pd.factorize(df[column]) for column in key_columns]
+            # Events with missing keys are dropped (like in `pd.DataFrame.groupby`).
+            is_keyed = np.logical_and.reduce([column_codes >= 0 for (column_codes, _) in factorized])
+            if not is_keyed.all():
+                (df, windows) = (df[is_keyed], windows[is_keyed])
+                factorized = [(column_codes[is_keyed], column_uniques) for (column_codes, column_uniques) in factorized]
+            (codes, uniques) = (np.zeros(len(df), dtype=np.int64), [()])
+            for (column_codes, column_uniques) in factorized:
+                (codes, combined_uniques) = pd.factorize(codes * len(column_uniques) + column_codes)
+                uniques = [uniques[unique // len(column_uniques)] + (column_uniques[unique % len(column_uniques)],)
+                        for unique in combined_uniques]
+            if len(key_columns) == 1:
+                uniques = [key for (key,) in uniques]
+            codes = np.array([key_codes.setdefault(key, len(key_codes)) for key in uniques], dtype=np.int64)[codes]
+        else:
+            codes = np.zeros(len(df), dtype=np.int64)
+        counts = np.ones(len(df), dtype=np.int64)
+        if value_column is None:
+            partials.append(reduce_by([windows, codes], sums=[counts]))
+            continue
+        values = df[value_column].to_numpy(dtype=np.float64)
+        # Missing values are counted as events, but are not aggregated (like in `pd.Series.sum`).
+        is_valid = ~np.isnan(values)
+        partials.append(reduce_by([windows, codes], sums=[counts, is_valid.astype(np.int64),
+                np.where(is_valid, values, 0)], mins=[np.where(is_valid, values, np.inf)],
+                maxs=[np.where(is_valid, values, -np.inf)]))
+        (windows, codes, values, counts) = (windows[is_valid], codes[is_valid], values[is_valid], counts[is_valid])
+        if quantiles and log_gamma:
+            # Positive values are counted in buckets (gamma^(i - 1), gamma^i].
+            buckets = np.full(len(values), NON_POSITIVE_BUCKET, dtype=np.int64)
+            is_positive = values > 0
+            buckets[is_positive] = np.ceil(np.log(values[is_positive]) / log_gamma).astype(np.int64)
+            quantile_partials.append(reduce_by([windows, codes, buckets], sums=[counts]))
+        elif quantiles:
+            quantile_partials.append(([windows, codes], [values], [], []))
+        # Partial aggregates are merged as they accumulate.
+        if sum(len(partial[0][0]) for partial in partials) > chunk_size:
+            partials = [reduce_by(*concatenate(partials))]
+        if log_gamma and sum(len(partial[0][0]) for partial in quantile_partials) > chunk_size:
+            quantile_partials = [reduce_by(*concatenate(quantile_partials))]
+    # Codes of keys are sorted by key.
+    keys = sorted(key_codes, key=lambda key: (key is None, key))
+    key_ranks = np.empty(len(keys), dtype=np.int64)
+    key_ranks[[key_codes[key] for key in keys]] = np.arange(len(keys))
+
+    def merge(partials, n_keys, n_sums, n_mins_maxs):
+        """Concatenation of partial aggregates, with sorted codes of keys."""
+        if not partials:
+            return ([np.zeros(0, dtype=np.int64)] * n_keys, [np.zeros(0)] * n_sums, [np.zeros(0)] * n_mins_maxs,
+                    [np.zeros(0)] * n_mins_maxs)
+        (keys, sums, mins, maxs) = concatenate(partials)
+        keys[1] = key_ranks[keys[1]]
+        return (keys, sums, mins, maxs)
+
+    (keys_, sums, mins, maxs) = merge(partials, 2, 1 if value_column is None else 3,
+            0 if value_column is None else 1)
+    ((windows, codes), sums, mins, maxs) = reduce_by(keys_, sums, mins, maxs)
+    first_window = time_to_ns(min_time) // window_ns if min_time is not None else \
+            (windows.min() if len(windows) else 0)
+    last_window = time_to_ns(max_time) // window_ns if max_time is not None else \
+            (windows.max() if len(windows) else -1)
+    n_windows = max(last_window - first_window + 1, 0)
+
+    def dense(windows, codes, values, fill_value, dtype=np.float64):
+        """Array of values by window (rows) and key (columns)."""
+        array = np.full((n_windows, len(keys)), fill_value, dtype=dtype)
+        is_in = (windows >= first_window) & (windows <= last_window)
+        array[windows[is_in] - first_window, codes[is_in]] = values[is_in]
+        return array
+
+    count = dense(windows, codes, sums[0], 0, np.int64)
+    if value_column is not None:
+        minimums = dense(windows, codes, np.where(sums[1] > 0, mins[0], np.nan), np.nan)
+        maximums = dense(windows, codes, np.where(sums[1] > 0, maxs[0], np.nan), np.nan)
+    results = {}
+    for statistic in statistics:
+        if statistic == "count":
+            results[statistic] = count
+        elif statistic == "throughput":
+            results[statistic] = count / (window_ns / 1e9)
+        elif statistic == "sum":
+            results[statistic] = dense(windows, codes, sums[2], 0)
+        elif statistic == "mean":
+            results[statistic] = dense(windows, codes, sums[2] / np.where(sums[1] > 0, sums[1], np.nan), np.nan)
+        elif statistic == "min":
+            results[statistic] = minimums
+        elif statistic == "max":
+            results[statistic] = maximums
+    if quantiles and log_gamma:
+        (keys_, sums, _, _) = merge(quantile_partials, 3, 1, 0)
+        ((windows, codes, buckets), (counts,), _, _) = reduce_by(keys_, sums)
+        values = np.where(buckets == NON_POSITIVE_BUCKET, 0,
+                2 * np.exp(buckets * log_gamma) / (1 + np.exp(log_gamma)))
+    elif quantiles:
+        (keys_, (values,), _, _) = merge(quantile_partials, 2, 1, 0)
+        order = np.lexsort((values, keys_[1], keys_[0]))
+        (windows, codes, values) = (keys_[0][order], keys_[1][order], values[order])
+        counts = np.ones(len(values), dtype=np.int64)
+    if quantiles:
+        # Values of every window and key are sorted, and counted.
+        starts = group_starts([windows, codes])
+        cumulative_counts = np.cumsum(counts)
+        offsets = cumulative_counts[starts] - counts[starts]
+        sizes = np.add.reduceat(counts, starts) if len(starts) else np.zeros(0, dtype=np.int64)
+        for quantile in quantiles:
+            positions = quantile * (sizes - 1)
+            # Indexes of the values of ranks floor(q * (n - 1)) and ceil(q * (n - 1)).
+            lows = np.searchsorted(cumulative_counts, offsets + np.floor(positions).astype(np.int64) + 1)
+            highs = np.searchsorted(cumulative_counts, offsets + np.ceil(positions).astype(np.int64) + 1)
+            # Linear interpolation, like `pd.Series.quantile`.
+            quantile_values = values[lows] + (values[highs] - values[lows]) * (positions - np.floor(positions))
+            results[quantile_column(quantile)] = dense(windows[starts], codes[starts], quantile_values, np.nan)
+            if log_gamma:
+                # Estimates are within the minimum and maximum values.
+                results[quantile_column(quantile)] = np.clip(results[quantile_column(quantile)], minimums, maximums)
+    index = np.arange(first_window, first_window + n_windows, dtype=np.int64) * window_ns
+    index = pd.DatetimeIndex(index.astype("datetime64[ns]"), name="time") if is_datetime else \
+            pd.Index(index / 1e9, name="time")
+    if not key_columns:
+        return pd.DataFrame({column: array[:, 0] for (column, array) in results.items()}, index=index)
+    columns = pd.MultiIndex.from_tuples(keys, names=key_columns) if len(key_columns) > 1 else \
+            pd.Index(keys, name=key_columns[0])
+    return pd.concat({column: pd.DataFrame(array, index=index, columns=columns)
+            for (column, array) in results.items()}, axis=1)
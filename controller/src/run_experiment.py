@@ -23,17 +23,49 @@ SYS_CONF = None
 WL_CONF = None
 BACKEND_CONF = None
 PARSE_LOG_FILES = None
+PARSE_LOG_FILES_LIVE = None
+PARSED_LOG_FORMAT = None
+DATABASE_SNAPSHOT_DIRPATH = None
+MISSING_DATABASE_SNAPSHOTS = None
+DATABASES_RESTORED = None
 DIRNAME = None
 METADATA = None
 
 
 ### Utilities
+# Log parsers of this source tree, which replace those of the release installed
+# on the nodes (see `install_buzzblogbenchmark`).
+PARSERS_DIRPATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "..", "..", "analysis", "parsers")
 LOG_FILENAME_TO_PARSER = {
   "loadgen.log": "/opt/BuzzBlogBenchmark/analysis/parsers/loadgen_parser.py",
+  "loadgen.bin": "/opt/BuzzBlogBenchmark/analysis/parsers/loadgen_parser.py",
   "queries.log": "/opt/BuzzBlogBenchmark/analysis/parsers/query_parser.py",
   "redis.log": "/opt/BuzzBlogBenchmark/analysis/parsers/redis_parser.py",
   "calls.log": "/opt/BuzzBlogBenchmark/analysis/parsers/rpc_parser.py",
 }
+# Options of parsers, other than input and output file paths.
+LOG_FILENAME_TO_PARSER_OPTIONS = {
+  "queries.log": "--fingerprints_filepath {dirpath}/queries.fingerprints.csv",
+}
+# Names of parsers (see `analysis/parsers/tail_parser.py`) of log files parsed
+# while they are written, by log filename and by monitor name.
+LOG_FILENAME_TO_LIVE_PARSER = {
+  "loadgen.log": "loadgen",
+  "queries.log": "query",
+  "redis.log": "redis",
+  "calls.log": "rpc",
+}
+MONITOR_NAME_TO_LIVE_PARSER = {
+  "tcplistenbl-bpftrace": "tcplistenbl",
+  "tcpretrans-bpftrace": "tcpretrans",
+}
+# Maximum number of seconds that log parsers take to parse the remaining lines
+# once stopped, before they are killed.
+LOG_PARSERS_STOP_TIMEOUT = 120
+# Counts of the population block of workload configurations, which are split
+# across loadgens.
+POPULATION_COUNTS = ["accounts", "posts", "follows", "likes"]
 
 
 def timestamp():
@@ -85,7 +117,8 @@ def start_container(node_hostname, node_conf, container_name, ssh_client):
       " " +
       container_conf["image"])
   time.sleep(16)
-  if container_conf["image"].startswith("postgres"):
+  # Databases restored from snapshots already have their schema.
+  if container_conf["image"].startswith("postgres") and not DATABASES_RESTORED:
     # Setup the database.
     subprocess.run("psql -U postgres -d %s -h %s -p %s -f %s" % (
         container_name.split('_')[0],
@@ -210,6 +243,14 @@ def install_buzzblogbenchmark(node_hostname, node_conf, ssh_client):
       "sudo tar -C /opt/BuzzBlogBenchmark -xzf /opt/BuzzBlogBenchmark/v{VERSION}.tar.gz && "
       "sudo mv /opt/BuzzBlogBenchmark/BuzzBlogBenchmark-{VERSION}/* /opt/BuzzBlogBenchmark && "
       "sudo rm -rf /opt/BuzzBlogBenchmark/BuzzBlogBenchmark-{VERSION}".format(VERSION=VERSION))
+  # Options of log parsers (e.g., `--workers` and `--parquet_filepath`) and
+  # `tail_parser.py` are not in that release.
+  ssh_client.exec("rm -rf /tmp/BuzzBlogBenchmark-parsers")
+  ssh_client.put(PARSERS_DIRPATH, "/tmp/BuzzBlogBenchmark-parsers")
+  ssh_client.exec(
+      "sudo rm -rf /opt/BuzzBlogBenchmark/analysis/parsers && "
+      "sudo mkdir -p /opt/BuzzBlogBenchmark/analysis && "
+      "sudo mv /tmp/BuzzBlogBenchmark-parsers /opt/BuzzBlogBenchmark/analysis/parsers")
 
 
 @nodes_with_container(".+")
@@ -235,7 +276,7 @@ def install_pandas(node_hostname, node_conf, ssh_client):
       "sudo apt-get update && "
       "sudo DEBIAN_FRONTEND=noninteractive apt-get -y install "
           "python3-pip && "
-      "pip3 install pandas==1.3.3")
+      "pip3 install pandas==1.3.3 pyarrow==5.0.0")
 
 
 @nodes_with_monitor(".+-bpfcc")
@@ -349,6 +390,46 @@ def start_monitors(node_hostname, node_conf, ssh_client):
             log=monitor_conf.get("log", "/dev/null")))
 
 
+def container_log_filenames(container_name):
+  """Names of the log files that a container writes (see
+  `LOG_FILENAME_TO_LIVE_PARSER`): requests of loadgens, RPCs of API gateways
+  and services, and queries and Redis commands of services with a database or
+  a Redis instance."""
+  if container_name.startswith("loadgen"):
+    return ["loadgen.log"]
+  if container_name.startswith("apigateway"):
+    return ["calls.log"]
+  if container_name.endswith("_service"):
+    backend_conf = BACKEND_CONF[container_name[:container_name.find('_')]]
+    return ["calls.log"] + \
+        (["queries.log"] if "database" in backend_conf else []) + \
+        (["redis.log"] if "redis" in backend_conf else [])
+  return []
+
+
+@all_nodes
+def start_log_parsers(node_hostname, node_conf, ssh_client):
+  follow = []
+  for container_name in node_conf.get("containers", {}):
+    # Log files are followed from when containers create them (see
+    # `start_container`).
+    for log_filename in container_log_filenames(container_name):
+      follow.append((os.path.join("/tmp", container_name, log_filename),
+          LOG_FILENAME_TO_LIVE_PARSER[log_filename]))
+  for monitor_name, monitor_conf in node_conf.get("monitors", {}).items():
+    if monitor_name in MONITOR_NAME_TO_LIVE_PARSER:
+      follow.append((monitor_conf["log"],
+          MONITOR_NAME_TO_LIVE_PARSER[monitor_name]))
+  if not follow:
+    return
+  ssh_client.exec("nohup nice -n 19 python3 "
+      "/opt/BuzzBlogBenchmark/analysis/parsers/tail_parser.py "
+      "--parsed_log_format %s " % PARSED_LOG_FORMAT +
+      " ".join(["--follow %s %s" % (log_filepath, parser_name)
+          for (log_filepath, parser_name) in follow]) + " " +
+      "> /tmp/tail_parser.log 2>&1 < /dev/null &")
+
+
 def start_containers():
   containers = []
   for node_hostname, node_conf in SYS_CONF.items():
@@ -385,6 +466,17 @@ def run_teardown_scripts(node_hostname, node_conf, ssh_client):
     ssh_client.exec(script)
 
 
+@all_nodes
+def stop_log_parsers(node_hostname, node_conf, ssh_client):
+  # Log parsers parse the remaining lines and close their output files.
+  ssh_client.exec("pkill -f 'analysis/parsers/[t]ail_parser.py'; "
+      "for i in $(seq {timeout}); do "
+      "pgrep -f 'analysis/parsers/[t]ail_parser.py' > /dev/null || break; "
+      "sleep 1; done; "
+      "pkill -9 -f 'analysis/parsers/[t]ail_parser.py'".format(
+          timeout=LOG_PARSERS_STOP_TIMEOUT))
+
+
 @all_nodes
 def stop_containers(node_hostname, node_conf, ssh_client):
   ssh_client.exec("sudo docker container stop $(sudo docker container ls -aq | grep -v ^$(sudo docker ps -aqf \"name=benchmarkcontroller\")$) && "
@@ -403,17 +495,21 @@ def clear_databases(node_hostname, node_conf, ssh_client):
 @nodes_with_monitor(".+")
 def fetch_monitoring_data(node_hostname, node_conf, ssh_client):
   for monitor_name, monitor_conf in node_conf["monitors"].items():
-    if PARSE_LOG_FILES:
+    if PARSE_LOG_FILES and not (PARSE_LOG_FILES_LIVE and
+        monitor_name in MONITOR_NAME_TO_LIVE_PARSER):
       if monitor_name == "collectl":
         ssh_client.exec("for filename in $(find %s -name '*.gz' -type f); do "
             "python3 /opt/BuzzBlogBenchmark/analysis/parsers/collectl_parser.py "
-            "--log_filepath ${filename} --csv_filepath ${filename/.gz/.csv}; done" % monitor_conf["dirpath"])
+            "--log_filepath ${filename} --%s_filepath ${filename/.gz/.%s}; done" % (monitor_conf["dirpath"],
+                PARSED_LOG_FORMAT, PARSED_LOG_FORMAT))
       if monitor_name == "tcplistenbl-bpftrace":
         ssh_client.exec("python3 /opt/BuzzBlogBenchmark/analysis/parsers/tcplistenbl_parser.py "
-            "--log_filepath {dirpath}/log --csv_filepath {dirpath}/log.csv".format(dirpath=monitor_conf["dirpath"]))
+            "--log_filepath {dirpath}/log --{format}_filepath {dirpath}/log.{format} --workers $(nproc)".format(
+                dirpath=monitor_conf["dirpath"], format=PARSED_LOG_FORMAT))
       if monitor_name == "tcpretrans-bpftrace":
         ssh_client.exec("python3 /opt/BuzzBlogBenchmark/analysis/parsers/tcpretrans_parser.py "
-            "--log_filepath {dirpath}/log --csv_filepath {dirpath}/log.csv".format(dirpath=monitor_conf["dirpath"]))
+            "--log_filepath {dirpath}/log --{format}_filepath {dirpath}/log.{format} --workers $(nproc)".format(
+                dirpath=monitor_conf["dirpath"], format=PARSED_LOG_FORMAT))
     ssh_client.exec("tar -C {dirpath} -czf /tmp/{monitor_name}.tar.gz .".format(
         monitor_name=monitor_name, dirpath=monitor_conf["dirpath"]))
     ssh_client.copy("/tmp/{monitor_name}.tar.gz".format(
@@ -429,20 +525,97 @@ def fetch_container_logs(node_hostname, node_conf, ssh_client):
         "{dirpath}/{container_name}.log 2>&1".format(
             container_name=container_name, dirpath=dirpath))
     if PARSE_LOG_FILES:
-      for log_filename in ssh_client.exec("ls {dirpath}".format(dirpath=dirpath))[0].split():
-        if isinstance(log_filename, bytes):
-          log_filename = log_filename.decode("utf-8")
+      log_filenames = [log_filename.decode("utf-8")
+          if isinstance(log_filename, bytes) else log_filename
+          for log_filename in ssh_client.exec("ls {dirpath}".format(
+              dirpath=dirpath))[0].split()]
+      for log_filename in log_filenames:
+        # Requests of binary logs are not in their text counterparts.
+        if log_filename.endswith(".log") and \
+            os.path.splitext(log_filename)[0] + ".bin" in log_filenames:
+          continue
+        # Log files parsed while they were written.
+        if PARSE_LOG_FILES_LIVE and log_filename in LOG_FILENAME_TO_LIVE_PARSER:
+          continue
         if log_filename in LOG_FILENAME_TO_PARSER:
           ssh_client.exec("python3 {parser_path} "
               "--log_filepath {log_filepath} "
-              "--csv_filepath {csv_filepath}".format(
+              "--{format}_filepath {output_filepath} "
+              "--workers $(nproc) {options}".format(
                   parser_path=LOG_FILENAME_TO_PARSER[log_filename],
                   log_filepath=os.path.join(dirpath, log_filename),
-                  csv_filepath=os.path.join(dirpath, os.path.splitext(log_filename)[0] + ".csv")))
+                  format=PARSED_LOG_FORMAT,
+                  output_filepath=os.path.join(dirpath, os.path.splitext(log_filename)[0] + "." + PARSED_LOG_FORMAT),
+                  options=LOG_FILENAME_TO_PARSER_OPTIONS.get(log_filename, "").format(dirpath=dirpath)))
     ssh_client.exec("tar -C {dirpath} -czf {dirpath}.tar.gz .".format(
         dirpath=dirpath))
     ssh_client.copy("{dirpath}.tar.gz".format(dirpath=dirpath),
         os.path.join(DIRNAME, "logs", node_hostname))
+    if PARSE_LOG_FILES_LIVE:
+      # Log parsers of the next experiment start before its containers, so
+      # they must not find the logs of this one.
+      ssh_client.exec("rm -rf %s" % dirpath)
+
+
+@nodes_with_container(".*_database")
+def check_database_snapshots(node_hostname, node_conf, ssh_client):
+  for container_name in node_conf["containers"]:
+    if container_name.endswith("_database"):
+      snapshot_filepath = os.path.join(DATABASE_SNAPSHOT_DIRPATH,
+          "%s.tar.gz" % container_name)
+      if not ssh_client.exec("test -f {filepath} && echo true".format(
+          filepath=snapshot_filepath))[0].strip():
+        MISSING_DATABASE_SNAPSHOTS.append((node_hostname, container_name))
+
+
+@nodes_with_container(".*_database")
+def snapshot_databases(node_hostname, node_conf, ssh_client):
+  for container_name, container_conf in node_conf["containers"].items():
+    if container_name.endswith("_database"):
+      ssh_client.exec("sudo mkdir -p {dirpath} && "
+          "sudo tar -C {volume} -czf {dirpath}/{container_name}.tar.gz .".format(
+              dirpath=DATABASE_SNAPSHOT_DIRPATH,
+              volume=container_conf["options"]["volume"].split(':')[0],
+              container_name=container_name))
+
+
+@nodes_with_container(".*_database")
+def restore_databases(node_hostname, node_conf, ssh_client):
+  for container_name, container_conf in node_conf["containers"].items():
+    if container_name.endswith("_database"):
+      ssh_client.exec("sudo rm -rf {volume} && sudo mkdir -p {volume} && "
+          "sudo tar -C {volume} -xzpf {dirpath}/{container_name}.tar.gz".format(
+              dirpath=DATABASE_SNAPSHOT_DIRPATH,
+              volume=container_conf["options"]["volume"].split(':')[0],
+              container_name=container_name))
+
+
+def populate_databases():
+  """Restore databases from snapshots of their populated volumes. Snapshots
+  are first taken, if missing, by running loadgens only to populate BuzzBlog.
+  """
+  global WL_CONF
+  global MISSING_DATABASE_SNAPSHOTS
+  global DATABASES_RESTORED
+  MISSING_DATABASE_SNAPSHOTS = []
+  check_database_snapshots()
+  update_metadata({"database_snapshot": DATABASE_SNAPSHOT_DIRPATH,
+      "database_snapshot_taken": bool(MISSING_DATABASE_SNAPSHOTS)})
+  if MISSING_DATABASE_SNAPSHOTS:
+    update_metadata({"population_start_time": timestamp()})
+    workload_conf = WL_CONF
+    WL_CONF = dict(workload_conf, populate_only=True)
+    copy_workload_configuration_file()
+    start_containers()
+    stop_containers()
+    snapshot_databases()
+    clear_databases()
+    WL_CONF = workload_conf
+    update_metadata({"population_end_time": timestamp()})
+  restore_databases()
+  DATABASES_RESTORED = True
+  # Loadgens must not populate BuzzBlog again.
+  del WL_CONF["population"]
 
 
 ### Main program
@@ -460,6 +633,12 @@ def main():
   parser.add_argument("--docker_hub_password", required=False, default="",
       action="store", help="Docker Hub password")
   parser.add_argument("--parse_log_files", action="store_true")
+  parser.add_argument("--parse_log_files_live", action="store_true",
+      help="Parse log files while they are written (implies "
+      "--parse_log_files)")
+  parser.add_argument("--parsed_log_format", required=False, default="csv",
+      action="store", type=str, choices=["csv", "parquet"],
+      help="Format of parsed log files (Parquet files have typed columns)")
   args = parser.parse_args()
   # Set Docker hub credentials.
   global DOCKER_HUB_USERNAME
@@ -468,7 +647,11 @@ def main():
   DOCKER_HUB_PASSWORD = args.docker_hub_password or ""
   # Set options.
   global PARSE_LOG_FILES
-  PARSE_LOG_FILES = args.parse_log_files
+  PARSE_LOG_FILES = args.parse_log_files or args.parse_log_files_live
+  global PARSE_LOG_FILES_LIVE
+  PARSE_LOG_FILES_LIVE = args.parse_log_files_live
+  global PARSED_LOG_FORMAT
+  PARSED_LOG_FORMAT = args.parsed_log_format
   # Load workload configuration(s).
   workload_confs = []
   if args.workload_conf:
@@ -539,11 +722,32 @@ def main():
       global WL_CONF
       WL_CONF = workload_conf.copy()
       WL_CONF["sessions"] //= count_containers("loadgen.*")
+      global DATABASE_SNAPSHOT_DIRPATH
+      DATABASE_SNAPSHOT_DIRPATH = None
+      global DATABASES_RESTORED
+      DATABASES_RESTORED = False
+      if "population" in WL_CONF:
+        WL_CONF["population"] = {
+            key: value // count_containers("loadgen.*")
+                if key in POPULATION_COUNTS else value
+            for (key, value) in WL_CONF["population"].items()
+        }
+        DATABASE_SNAPSHOT_DIRPATH = WL_CONF["population"].pop("snapshot", None)
+        # Snapshots are only reused by experiments with the same population.
+        if DATABASE_SNAPSHOT_DIRPATH:
+          DATABASE_SNAPSHOT_DIRPATH = os.path.join(DATABASE_SNAPSHOT_DIRPATH,
+              "_".join(["loadgens-%s" % count_containers("loadgen.*")] +
+                  ["%s-%s" % (key, WL_CONF["population"].get(key, 0))
+                      for key in POPULATION_COUNTS]))
       # Initialize experiment metadata.
       global METADATA
       METADATA = {}
       update_metadata({"user": subprocess.getoutput("whoami"),
           "start_time": timestamp(), "description": args.description})
+      if "population" in WL_CONF:
+        # Counts of every loadgen.
+        update_metadata({"population": dict(WL_CONF["population"],
+            loadgens=count_containers("loadgen.*"))})
       # Save configuration files.
       with open(os.path.join(DIRNAME, "conf", "system.yml"), 'w') as system_conf_file_copy:
         system_conf_file_copy.write(yaml.dump(system_conf))
@@ -551,15 +755,26 @@ def main():
         workload_conf_file_copy.write(yaml.dump(workload_conf))
       # Save system specification of each node.
       save_system_specs()
-      # Copy workload configuration to each node with loadgen containers.
-      copy_workload_configuration_file()
       # Configure nodes.
       run_setup_scripts()
+      # Populate databases from snapshots, if set.
+      if DATABASE_SNAPSHOT_DIRPATH:
+        populate_databases()
+      # Copy workload configuration to each node with loadgen containers.
+      copy_workload_configuration_file()
       # Run benchmark.
       start_monitors()
+      if PARSE_LOG_FILES_LIVE:
+        start_log_parsers()
+      if "population" in WL_CONF:
+        # Loadgens populate BuzzBlog when they start, and write the duration
+        # of every phase to their container logs.
+        update_metadata({"population_start_time": timestamp()})
       start_containers()
       stop_monitors()
       stop_containers()
+      if PARSE_LOG_FILES_LIVE:
+        stop_log_parsers()
       # Restore nodes' configuration.
       run_teardown_scripts()
       # Fetch system resource and event monitoring data from nodes.
@@ -57,3 +57,9 @@ class SSHClient:
         with scp.SCPClient(self._client.get_transport(), sanitize=lambda x: x) as \
                 scp_client:
             scp_client.get(remote_path, local_path, recursive=True)
+
+  def put(self, local_path, remote_path):
+    """Copy local file (or directory) to the remote machine."""
+    with self._semaphore:
+        with scp.SCPClient(self._client.get_transport()) as scp_client:
+            scp_client.put(local_path, remote_path, recursive=True)
@@ -0,0 +1,224 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Workload generation with asyncio and aiohttp.
+
+This engine reads the same workload configuration as ATLoad (`sessions`,
+`throughput`, `duration`, `surges`, and `request_graph`) and logs requests
+with the same pattern, but runs all sessions as coroutines of a single event
+loop on a non-blocking HTTP client.
+
+Each session walks the request graph starting at `main`. Request arrivals of a
+session follow a Poisson process whose rate is the target throughput divided by
+the number of sessions. The target throughput ramps up linearly during
+`duration.ramp_up`, ramps down linearly during `duration.ramp_down`, and is
+multiplied by `intensity` during each surge.
+
+With the `closed` schedule, a session draws its next arrival after its previous
+request completes. With the `open` schedule, a session draws its next arrival
+from the intended start time of its previous request, so a slow response delays
+the following requests of the session but not their intended start times.
+Either way, every log line carries the lag between the intended and the actual
+start time of the request.
+"""
+
+import asyncio
+import functools
+import json
+import random
+import time
+
+import aiohttp
+import yaml
+
+import buzzblog
+
+# Status code of requests that got no response because of a connection error
+# (e.g., the connection was refused or reset).
+CONNECTION_ERROR_STATUS_CODE = 0
+
+
+class Response:
+  __slots__ = ["status_code", "content"]
+
+  def __init__(self, status_code, content):
+    self.status_code = status_code
+    self.content = content
+
+  def json(self):
+    return json.loads(self.content)
+
+
+class Transport(buzzblog.Transport):
+  """aiohttp transport.
+
+  aiohttp keeps every idle connection of a pool alive, so `pool_size` only
+  bounds the number of simultaneous connections of a pool (of a session, or
+  shared by all sessions). Requests wait for a connection of a full pool.
+  """
+
+  def __init__(self, pool, pool_size, stats_interval):
+    super().__init__(pool, pool_size, stats_interval)
+    self._http_sessions = []
+    self._n_connections = 0
+    self._trace_config = aiohttp.TraceConfig()
+    self._trace_config.on_connection_create_end.append(
+        self._on_connection_create_end)
+
+  async def _on_connection_create_end(self, http_session, context, params):
+    self._n_connections += 1
+
+  def _new_http_session(self, **connector_kwargs):
+    http_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(**connector_kwargs),
+        timeout=aiohttp.ClientTimeout(total=30),
+        trace_configs=[self._trace_config])
+    self._http_sessions.append(http_session)
+    return http_session
+
+  def http_session(self):
+    """Return the object to issue a new session's requests with. Must be
+    called from a coroutine."""
+    if self._pool == "session":
+      return self._new_http_session(limit=self._pool_size)
+    if not self._http_sessions:
+      if self._pool == "process":
+        self._new_http_session(limit=self._pool_size)
+      else:
+        self._new_http_session(limit=0, force_close=True)
+    return self._http_sessions[0]
+
+  async def send(self, http_session, method, url, **kwargs):
+    self._n_requests += 1
+    try:
+      async with http_session.request(method, url, **kwargs) as r:
+        return Response(r.status, await r.read())
+    except asyncio.TimeoutError:
+      return Response(408, b"")
+    except aiohttp.ClientError:
+      return Response(CONNECTION_ERROR_STATUS_CODE, b"")
+
+  def n_connections(self):
+    return self._n_connections
+
+  async def close(self):
+    for http_session in self._http_sessions:
+      await http_session.close()
+
+
+class Workload:
+  def __init__(self, workload_conf_filepath, log_filepath, seed, hostname,
+      port, transport, schedule, request_recorder):
+    with open(workload_conf_filepath) as workload_conf_file:
+      self._conf = yaml.load(workload_conf_file, Loader=yaml.Loader)
+    self._log_filepath = log_filepath
+    self._random = random.Random(seed)
+    self._url_prefix = "http://{hostname}:{port}".format(hostname=hostname,
+        port=port)
+    self._transport = transport
+    self._request_recorder = request_recorder
+    self._schedule = schedule
+    self._request_graph = {
+        request_type: (list(transitions.keys()),
+            list(transitions.values()))
+        for (request_type, transitions) in self._conf["request_graph"].items()
+    }
+    self._max_throughput = self._conf["throughput"] * \
+        max([1.0] + [surge["intensity"] for surge in self._conf["surges"]])
+    self._logfile = None
+    self._start_time = None
+
+  def throughput(self, t):
+    """Target throughput at `t` seconds since the beginning of the workload."""
+    duration = self._conf["duration"]
+    if t < duration["ramp_up"]:
+      throughput = self._conf["throughput"] * t / duration["ramp_up"]
+    elif t > duration["total"] - duration["ramp_down"]:
+      throughput = self._conf["throughput"] * (duration["total"] - t) / \
+          duration["ramp_down"]
+    else:
+      throughput = self._conf["throughput"]
+    for surge in self._conf["surges"]:
+      if surge["start"] <= t < surge["start"] + surge["duration"]:
+        throughput *= surge["intensity"]
+    return throughput
+
+  def _next_arrival(self, t):
+    """Draw the next request time of a session after `t` (by thinning a
+    Poisson process at the maximum throughput)."""
+    rate = self._max_throughput / self._conf["sessions"]
+    while True:
+      t += self._random.expovariate(rate)
+      if t >= self._conf["duration"]["total"] or \
+          self._random.random() * self._max_throughput < self.throughput(t):
+        return t
+
+  def _next_request_type(self, request_type):
+    request_types, weights = self._request_graph[request_type]
+    return self._random.choices(request_types, weights=weights)[0]
+
+  def _log(self, line):
+    self._logfile.write(line + "\n")
+
+  async def _request(self, session, http_session, request_type, intended_time,
+      request):
+    credentials = session.credentials()
+    auth = aiohttp.BasicAuth(*credentials) if credentials is not None else None
+    params = request.params or {}
+    params.update({"request_id": buzzblog.request_id()})
+    lag = max(asyncio.get_running_loop().time() - self._start_time -
+        intended_time, 0.0)
+    start_ns = time.monotonic_ns()
+    r = await self._transport.send(http_session, request.method,
+        self._url_prefix + request.path, auth=auth, params=params,
+        json=request.json)
+    latency_ns = time.monotonic_ns() - start_ns
+    self._request_recorder.record(self._log, self._url_prefix, request_type,
+        request, params, r.status_code, start_ns, latency_ns, lag)
+    self._transport.log_stats(self._log)
+    return r
+
+  async def _run_session(self):
+    loop = asyncio.get_running_loop()
+    session = buzzblog.BuzzBlogSession()
+    http_session = self._transport.http_session()
+    request_type = "main"
+    t = 0.0
+    while True:
+      t = self._next_arrival(t)
+      if t >= self._conf["duration"]["total"]:
+        break
+      await asyncio.sleep(t - (loop.time() - self._start_time))
+      request_type = self._next_request_type(request_type)
+      try:
+        await buzzblog.run_flow_async(getattr(session, request_type)(),
+            functools.partial(self._request, session, http_session,
+                request_type, t))
+      except Exception:
+        # Start over as a new user.
+        session = buzzblog.BuzzBlogSession()
+        request_type = "main"
+      if self._schedule == "closed":
+        t = loop.time() - self._start_time
+
+  async def _run(self):
+    with open(self._log_filepath, 'w') as self._logfile:
+      self._start_time = asyncio.get_running_loop().time()
+      await asyncio.gather(*[self._run_session()
+          for _ in range(self._conf["sessions"])])
+      await self._transport.close()
+
+  def run(self):
+    asyncio.run(self._run())
+
+
+def run(args):
+  transport = Transport(args.pool, args.pool_size, args.pool_stats_interval)
+  request_recorder = buzzblog.RequestRecorder(args)
+  workload = Workload(args.workload_conf, args.log, int(args.seed),
+      args.hostname, args.port, transport, args.schedule, request_recorder)
+  random.seed(None)
+  try:
+    workload.run()
+  finally:
+    request_recorder.close()
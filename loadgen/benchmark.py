@@ -0,0 +1,134 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Benchmark workload generation engines against a local stub server.
+
+The stub server answers every BuzzBlog endpoint immediately with a minimal
+JSON body, so that the measured throughput is bounded by the workload
+generator. Each engine is run with a target throughput above its capacity,
+and the achieved throughput and CPU time of the workload generator process are
+reported.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import yaml
+from aiohttp import web
+
+import binary_log
+
+REQUEST_LOG_PATTERN = re.compile(r"^\[.+\] \w+ \S+ (\d+) - latency=")
+ACCOUNT = {"id": 1, "username": "username"}
+POST = {"id": 1, "author": ACCOUNT}
+FOLLOW = {"id": 1, "follower": ACCOUNT, "followee": ACCOUNT}
+LIKE = {"id": 1, "account": ACCOUNT, "post": POST}
+PATH_TO_BODY = {
+    "account": ACCOUNT,
+    "post": POST,
+    "follow": FOLLOW,
+    "like": LIKE,
+    "trending": [],
+}
+
+
+async def _handle(request):
+  resource_name = request.path.split('/')[1]
+  body = PATH_TO_BODY.get(resource_name, {})
+  if request.method == "GET" and request.path.count('/') == 1:
+    body = [body]
+  return web.Response(text=json.dumps(body), content_type="application/json")
+
+
+def _run_stub_server(port):
+  app = web.Application()
+  app.router.add_route("*", "/{tail:.*}", _handle)
+  web.run_app(app, host="127.0.0.1", port=port, reuse_port=True,
+      print=None, access_log=None)
+
+
+def _run_engine(engine, args, workload_conf_filepath, log_filepath):
+  rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+  start_time = time.monotonic()
+  subprocess.run([sys.executable,
+      os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadgen.py"),
+      "--workload_conf", workload_conf_filepath, "--log", log_filepath,
+      "--hostname", "127.0.0.1", "--port", str(args.port), "--seed", "42",
+      "--engine", engine] + args.options.split(), check=True)
+  wall_time = time.monotonic() - start_time
+  cpu_time = resource.getrusage(resource.RUSAGE_CHILDREN).ru_utime + \
+      resource.getrusage(resource.RUSAGE_CHILDREN).ru_stime - \
+      rusage.ru_utime - rusage.ru_stime
+  n_requests = 0
+  n_successful = 0
+  binary_log_filepath = os.path.splitext(log_filepath)[0] + ".bin"
+  if os.path.exists(binary_log_filepath):
+    with open(binary_log_filepath, "rb") as logfile:
+      for record in binary_log.read_records(logfile):
+        n_requests += 1
+        n_successful += record[4] == 200
+  with open(log_filepath) as logfile:
+    for log in logfile:
+      match = REQUEST_LOG_PATTERN.match(log)
+      if match:
+        n_requests += 1
+        n_successful += match.group(1) == "200"
+  return (n_requests, n_successful, wall_time, cpu_time)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark workload generation "
+      "engines against a local stub server")
+  parser.add_argument("--workload_conf", required=True, action="store",
+      type=str, help="Path to a workload configuration file (its request graph "
+          "is used)")
+  parser.add_argument("--engines", required=False, default="eventlet,asyncio",
+      action="store", type=str, help="Comma-separated list of engines")
+  parser.add_argument("--sessions", required=False, default=1000,
+      action="store", type=int, help="Number of sessions")
+  parser.add_argument("--throughput", required=False, default=20000,
+      action="store", type=int, help="Target throughput (requests/s)")
+  parser.add_argument("--duration", required=False, default=30,
+      action="store", type=int, help="Duration (in seconds) of each run")
+  parser.add_argument("--port", required=False, default=18080, action="store",
+      type=int, help="Port of the stub server")
+  parser.add_argument("--stub_workers", required=False, default=4,
+      action="store", type=int, help="Number of stub server processes")
+  parser.add_argument("--options", required=False, default="", action="store",
+      type=str, help="Extra options passed to loadgen.py")
+  args = parser.parse_args()
+  with open(args.workload_conf) as workload_conf_file:
+    workload_conf = yaml.load(workload_conf_file, Loader=yaml.Loader)
+  workload_conf.update({
+      "sessions": args.sessions,
+      "throughput": args.throughput,
+      "duration": {"total": args.duration, "ramp_up": 0, "ramp_down": 0},
+      "surges": [],
+  })
+  stub_servers = [multiprocessing.Process(target=_run_stub_server,
+      args=(args.port,), daemon=True) for _ in range(args.stub_workers)]
+  for stub_server in stub_servers:
+    stub_server.start()
+  time.sleep(1)
+  with tempfile.TemporaryDirectory() as dirpath:
+    workload_conf_filepath = os.path.join(dirpath, "workload.yml")
+    with open(workload_conf_filepath, 'w') as workload_conf_file:
+      workload_conf_file.write(yaml.dump(workload_conf))
+    print("%-10s %10s %10s %12s %10s %14s" % ("engine", "requests",
+        "successful", "requests/s", "cpu (s)", "requests/cpu-s"))
+    for engine in args.engines.split(','):
+      n_requests, n_successful, wall_time, cpu_time = _run_engine(engine, args,
+          workload_conf_filepath, os.path.join(dirpath, engine + ".log"))
+      print("%-10s %10d %10d %12.1f %10.1f %14.1f" % (engine, n_requests,
+          n_successful, n_requests / wall_time, cpu_time,
+          n_requests / cpu_time if cpu_time else 0.0))
+  for stub_server in stub_servers:
+    stub_server.terminate()
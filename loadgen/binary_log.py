@@ -0,0 +1,131 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Binary request log.
+
+A binary request log is a sequence of batches. Every batch starts with a header
+(`BATCH_HEADER`) followed by `n_records` fixed-width records (`RECORD`). Start
+times are read from the monotonic clock, and the header carries the wall clock
+time and UTC offset at a monotonic instant, so that start times can be
+converted to local timestamps. Since every batch is self-contained, the logs
+of multiple processes can be merged by concatenation.
+
+Request types, methods, and path templates are stored as indexes into
+`REQUEST_TYPES`, `METHODS`, and `PATH_TEMPLATES`. `analysis/parsers/
+loadgen_parser.py` keeps a copy of these tables, which must be updated along
+with `VERSION`.
+"""
+
+import datetime
+import struct
+import threading
+import time
+
+MAGIC = b"BBRL"
+VERSION = 1
+# magic, version, n_records, wall clock time (ns), monotonic time (ns), UTC
+# offset (s).
+BATCH_HEADER = struct.Struct("<4sHIqqi")
+# request type, method, path template, request id, status code, start time
+# (monotonic ns), latency (us), lag (us).
+RECORD = struct.Struct("<BBB8sHqII")
+REQUEST_TYPES = ["create_account", "update_account", "create_post",
+    "delete_post", "follow_account", "delete_follow", "like_post",
+    "delete_like", "retrieve_recent_posts", "retrieve_post",
+    "retrieve_post_likes", "retrieve_account", "retrieve_account_posts",
+    "retrieve_account_followers", "retrieve_account_followees",
+    "retrieve_account_likes", "list_trending_hashtags"]
+METHODS = ["get", "post", "put", "delete"]
+PATH_TEMPLATES = ["/account", "/account/{id}", "/follow", "/follow/{id}",
+    "/like", "/like/{id}", "/post", "/post/{id}", "/trending"]
+_REQUEST_TYPE_TO_INDEX = {request_type: i
+    for (i, request_type) in enumerate(REQUEST_TYPES)}
+_METHOD_TO_INDEX = {method: i for (i, method) in enumerate(METHODS)}
+_PATH_TEMPLATE_TO_INDEX = {path_template: i
+    for (i, path_template) in enumerate(PATH_TEMPLATES)}
+
+
+def _path_template(path):
+  resource = path.split('/', 3)
+  return '/' + resource[1] + ("/{id}" if len(resource) > 2 else "")
+
+
+class BinaryRequestLog:
+  """Buffer request records in memory and write them in batches from a
+  background thread every `flush_interval` seconds."""
+
+  def __init__(self, log_filepath, flush_interval=1.0):
+    self._logfile = open(log_filepath, "wb")
+    self._flush_interval = flush_interval
+    self._records = []
+    self._records_lock = threading.Lock()
+    self._closed = threading.Event()
+    self._writer = threading.Thread(target=self._write_periodically,
+        daemon=True)
+    self._writer.start()
+
+  def record(self, request_type, method, path, request_id, status_code,
+      start_ns, latency_ns, lag=None):
+    """Buffer a request record. `start_ns` is read from `time.monotonic_ns`;
+    `lag` is in seconds."""
+    with self._records_lock:
+      self._records.append((request_type, method, path, request_id,
+          status_code, start_ns, latency_ns, lag))
+
+  def _write(self):
+    with self._records_lock:
+      records, self._records = self._records, []
+    if not records:
+      return
+    utc_offset = datetime.datetime.now().astimezone().utcoffset()
+    batch = [BATCH_HEADER.pack(MAGIC, VERSION, len(records), time.time_ns(),
+        time.monotonic_ns(), int(utc_offset.total_seconds()))]
+    for (request_type, method, path, request_id, status_code, start_ns,
+        latency_ns, lag) in records:
+      batch.append(RECORD.pack(_REQUEST_TYPE_TO_INDEX[request_type],
+          _METHOD_TO_INDEX[method],
+          _PATH_TEMPLATE_TO_INDEX[_path_template(path)],
+          request_id.encode("ascii"), status_code, start_ns,
+          min(latency_ns // 1000, 0xFFFFFFFF),
+          min(int((lag or 0.0) * 1000000), 0xFFFFFFFF)))
+    self._logfile.write(b"".join(batch))
+    # Batches are not lost if the workload generator is killed.
+    self._logfile.flush()
+
+  def _write_periodically(self):
+    while not self._closed.wait(self._flush_interval):
+      self._write()
+
+  def close(self):
+    self._closed.set()
+    self._writer.join()
+    self._write()
+    self._logfile.close()
+
+
+def _complete_records(buffer):
+  return buffer[:len(buffer) - len(buffer) % RECORD.size]
+
+
+def read_records(logfile):
+  """Iterate over (request type, method, path template, request id, status
+  code, start time, latency, lag) of the records of a binary request log.
+  Start times are local `datetime`s; latency and lag are in seconds. A last
+  batch that was not completely written (e.g., by a killed workload generator)
+  is read up to its last complete record."""
+  while True:
+    header = logfile.read(BATCH_HEADER.size)
+    if len(header) < BATCH_HEADER.size:
+      return
+    magic, version, n_records, wall_ns, monotonic_ns, utc_offset = \
+        BATCH_HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+      raise ValueError("Not a version %s binary request log" % VERSION)
+    for (request_type, method, path_template, request_id, status_code,
+        start_ns, latency_us, lag_us) in RECORD.iter_unpack(
+        _complete_records(logfile.read(n_records * RECORD.size))):
+      yield (REQUEST_TYPES[request_type], METHODS[method],
+          PATH_TEMPLATES[path_template], request_id.decode("ascii"),
+          status_code, datetime.datetime.utcfromtimestamp(
+              (wall_ns + start_ns - monotonic_ns) / 1e9 + utc_offset),
+          latency_us / 1e6, lag_us / 1e6)
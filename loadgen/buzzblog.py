@@ -0,0 +1,527 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""BuzzBlog sessions, independent of the engine that drives them.
+
+Every request type of a session is a generator that yields the `Request`s to
+be issued and receives their responses back. Engines (`eventlet_engine`,
+`asyncio_engine`) send the requests and feed the responses into the generator,
+so that the same request flows run on blocking and non-blocking HTTP clients.
+"""
+
+import abc
+import bisect
+import collections
+import datetime
+import itertools
+import os
+import random
+import string
+import time
+
+import binary_log
+import histogram
+
+
+LETTERS = string.ascii_lowercase + string.ascii_uppercase + string.digits
+# Maps every byte to a letter. Letters of the first 256 % 62 bytes are slightly
+# more likely than the others.
+_BYTE_TO_LETTER = bytes(ord(LETTERS[i % len(LETTERS)]) for i in range(256))
+_LETTER_PAIRS = [a + b for a in LETTERS for b in LETTERS]
+REQUEST_ID_PREFIX_LENGTH = 4
+REQUEST_ID_COUNTER_LENGTH = 4
+# Payloads are drawn from their own generator, which is not seeded with
+# `--seed` (loadgen containers share seeds but must create distinct accounts)
+# and does not consume draws from the generators that are.
+_payload_random = random.Random()
+
+
+def _random_string(length):
+  return _payload_random.getrandbits(8 * length).to_bytes(length,
+      "little").translate(_BYTE_TO_LETTER).decode("ascii")
+
+
+def _reset_request_ids():
+  global _request_id_prefix, _request_counter
+  _request_id_prefix = _random_string(REQUEST_ID_PREFIX_LENGTH)
+  _request_counter = itertools.count()
+
+
+def _reset_payloads():
+  _payload_random.seed()
+  _reset_request_ids()
+
+
+def request_id():
+  """Return a new request id: a random prefix drawn per process followed by a
+  counter. A new prefix is drawn whenever the counter wraps around."""
+  n = next(_request_counter)
+  if n >= len(_LETTER_PAIRS) ** 2:
+    _reset_request_ids()
+    n = next(_request_counter)
+  return _request_id_prefix + _LETTER_PAIRS[n // len(_LETTER_PAIRS)] + \
+      _LETTER_PAIRS[n % len(_LETTER_PAIRS)]
+
+
+_reset_request_ids()
+# Forked workers must not repeat the payloads and request ids of each other.
+os.register_at_fork(after_in_child=_reset_payloads)
+
+
+LOG_PATTERN = "[{ts}] {method} {url} {status_code} - latency={latency}"
+LAG_LOG_PATTERN = " lag={lag}"
+POOL_STATS_LOG_PATTERN = "[{ts}] pool={pool} connections={connections} " \
+    "requests={requests} reuse_ratio={reuse_ratio} " \
+    "connects_per_second={connects_per_second}"
+LOG_FORMATS = ["text", "binary", "none"]
+POOL_MODES = ["none", "session", "process"]
+SCHEDULES = ["closed", "open"]
+POST_LENGTH_DISTRIBUTIONS = ["constant", "uniform", "exponential"]
+SESSION_HISTORY_LENGTH = 64
+N_HASHTAGS = 1024
+HASHTAGS = ["#" + _random_string(10) for _ in range(N_HASHTAGS)]
+
+_post_length = 128
+_post_length_distribution = "constant"
+# Cumulative Zipf weights of hashtags, and hot sets of posts and accounts. None
+# if their popularity is uniform.
+_hashtag_cum_weights = None
+_hot_posts = None
+_hot_accounts = None
+
+Request = collections.namedtuple("Request", ["method", "path", "params", "json"],
+    defaults=[None, None])
+
+
+# Wall clock and monotonic time at the same instant, used to convert monotonic
+# start times of requests to timestamps.
+_WALL_TIME_NS = time.time_ns()
+_MONOTONIC_NS = time.monotonic_ns()
+
+
+def set_post_length(post_length, distribution):
+  """Set the mean length of post texts (excluding their hashtag) and its
+  distribution:
+    constant -- every post text has `post_length` letters.
+    uniform -- uniformly distributed between 1 and `2 * post_length - 1`.
+    exponential -- 1 plus exponentially distributed with mean
+        `post_length - 1`.
+  """
+  global _post_length, _post_length_distribution
+  _post_length = post_length
+  _post_length_distribution = distribution
+
+
+def _random_post_length():
+  if _post_length_distribution == "uniform":
+    return _payload_random.randint(1, 2 * _post_length - 1)
+  if _post_length_distribution == "exponential":
+    return 1 + int(_payload_random.expovariate(1 / max(_post_length - 1, 1)))
+  return _post_length
+
+
+def _zipf_cum_weights(n, exponent):
+  return list(itertools.accumulate(1 / rank ** exponent
+      for rank in range(1, n + 1)))
+
+
+class HotSet:
+  """Ids of up to `size` items whose popularity follows Zipf's law with
+  exponent `zipf`. Items are ranked in the order their ids are added; the id of
+  a removed item is replaced by the id of the least popular one. Items are
+  drawn from those added so far, which may be fewer than `size` (e.g., with a
+  small population)."""
+
+  __slots__ = ["_size", "_cum_weights", "_ids", "_ranks"]
+
+  def __init__(self, size, zipf):
+    if not isinstance(size, int) or size < 1:
+      raise ValueError("Size of hot set must be a positive integer: %r" %
+          (size,))
+    self._size = size
+    self._cum_weights = _zipf_cum_weights(size, zipf)
+    self._ids = []
+    self._ranks = {}
+
+  def add(self, id):
+    if len(self._ids) < self._size and id not in self._ranks:
+      self._ranks[id] = len(self._ids)
+      self._ids.append(id)
+
+  def remove(self, id):
+    rank = self._ranks.pop(id, None)
+    if rank is None:
+      return
+    last_id = self._ids.pop()
+    if rank < len(self._ids):
+      self._ids[rank] = last_id
+      self._ranks[last_id] = rank
+
+  def sample(self):
+    """Return the id of an item drawn by popularity. At least one item must
+    have been added."""
+    n = len(self._ids)
+    return self._ids[bisect.bisect(self._cum_weights,
+        random.random() * self._cum_weights[n - 1], 0, n - 1)]
+
+
+def set_popularity(popularity_conf):
+  """Set the popularity of hashtags, posts, and accounts from the
+  `popularity` block of a workload configuration:
+
+    popularity:
+      hashtags:
+        zipf: 1.0
+      posts:
+        zipf: 1.0
+        hot_set: 10000
+      accounts:
+        zipf: 1.0
+        hot_set: 10000
+
+  Hashtags are ranked in random order. Posts and accounts that are retrieved,
+  liked, and followed are drawn from a hot set of up to `hot_set` posts and
+  accounts, ranked in the order they are created or first seen in a
+  response. Entries that are omitted keep their default popularity: uniform
+  for hashtags, and the posts and accounts in the latest response for posts
+  and accounts.
+  """
+  global _hashtag_cum_weights, _hot_posts, _hot_accounts
+  if "hashtags" in popularity_conf:
+    _hashtag_cum_weights = _zipf_cum_weights(N_HASHTAGS,
+        popularity_conf["hashtags"]["zipf"])
+  hot_sets = {}
+  for items in ["posts", "accounts"]:
+    if items in popularity_conf:
+      try:
+        hot_sets[items] = HotSet(popularity_conf[items]["hot_set"],
+            popularity_conf[items]["zipf"])
+      except ValueError as error:
+        raise ValueError("popularity: %s: %s" % (items, error)) from None
+  _hot_posts = hot_sets.get("posts")
+  _hot_accounts = hot_sets.get("accounts")
+
+
+def random_hashtag():
+  if _hashtag_cum_weights is None:
+    return _payload_random.choice(HASHTAGS)
+  return _payload_random.choices(HASHTAGS,
+      cum_weights=_hashtag_cum_weights)[0]
+
+
+def add_post(post_id):
+  """Add a post to the hot set of posts, if any."""
+  if _hot_posts is not None:
+    _hot_posts.add(post_id)
+
+
+def add_account(account_id):
+  """Add an account to the hot set of accounts, if any."""
+  if _hot_accounts is not None:
+    _hot_accounts.add(account_id)
+
+
+def _target_post(post_id):
+  """Return the post to target after seeing `post_id` in a response."""
+  if _hot_posts is None:
+    return post_id
+  _hot_posts.add(post_id)
+  return _hot_posts.sample()
+
+
+def _target_account(account_id):
+  """Return the account to target after seeing `account_id` in a
+  response."""
+  if _hot_accounts is None:
+    return account_id
+  _hot_accounts.add(account_id)
+  return _hot_accounts.sample()
+
+
+def wall_time(monotonic_ns):
+  """Convert a `time.monotonic_ns` reading to a local `datetime`."""
+  return datetime.datetime.fromtimestamp(
+      (_WALL_TIME_NS + monotonic_ns - _MONOTONIC_NS) / 1e9)
+
+
+def format_log(start_time, method, url, params, status_code, latency,
+    lag=None):
+  """Format a request log line. `lag` is the delay (in seconds) between the
+  intended and the actual start time of the request, if known."""
+  query_string = "&".join(["%s=%s" % (k, v) for (k, v) in params.items()]) \
+      if params is not None else ""
+  return LOG_PATTERN.format(
+      ts=start_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+      method=method.upper(),
+      url=url + ("?" + query_string if query_string else ""),
+      status_code=status_code,
+      latency=format(latency, ".3f")) + \
+      (LAG_LOG_PATTERN.format(lag=format(lag, ".3f")) if lag is not None else "")
+
+
+def run_flow(flow, send):
+  """Run a request flow, sending each of its requests with `send`."""
+  try:
+    request = next(flow)
+    while True:
+      request = flow.send(send(request))
+  except StopIteration:
+    pass
+
+
+async def run_flow_async(flow, send):
+  """Run a request flow, sending each of its requests with coroutine `send`."""
+  try:
+    request = next(flow)
+    while True:
+      request = flow.send(await send(request))
+  except StopIteration:
+    pass
+
+
+class RequestRecorder:
+  """Record requests to the request log (in `log_format`) and to latency
+  histograms, if enabled.
+
+  Paths of the binary request log and of the histogram log are taken from
+  `args.binary_log` and `args.histogram_log`.
+  """
+
+  def __init__(self, args):
+    self._log_format = args.log_format
+    self._binary_log = binary_log.BinaryRequestLog(args.binary_log) \
+        if args.log_format == "binary" else None
+    self._histogram_log = histogram.HistogramLog(args.histogram_log,
+        args.histogram_interval) if args.histogram_interval else None
+
+  def record(self, log, url_prefix, request_type, request, params,
+      status_code, start_ns, latency_ns, lag=None):
+    """Record a request. Text log lines are written with `log`. `start_ns` is
+    read from `time.monotonic_ns`; `lag` is in seconds."""
+    if self._histogram_log is not None:
+      self._histogram_log.record(request_type, status_code, latency_ns)
+    if self._log_format == "text":
+      log(format_log(wall_time(start_ns), request.method,
+          url_prefix + request.path, params, status_code, latency_ns / 1e9,
+          lag))
+    elif self._log_format == "binary":
+      self._binary_log.record(request_type, request.method, request.path,
+          params["request_id"], status_code, start_ns, latency_ns, lag)
+
+  def close(self):
+    if self._binary_log is not None:
+      self._binary_log.close()
+    if self._histogram_log is not None:
+      self._histogram_log.close()
+
+
+class Transport(abc.ABC):
+  """Base class of the HTTP transports used by engines.
+
+  Pool modes:
+    none -- every request opens (and closes) its own TCP connection.
+    session -- every session keeps up to `pool_size` keep-alive connections.
+    process -- all sessions share up to `pool_size` keep-alive connections.
+  """
+
+  def __init__(self, pool, pool_size, stats_interval):
+    self._pool = pool
+    self._pool_size = pool_size
+    self._stats_interval = stats_interval
+    self._n_requests = 0
+    self._stats_time = time.monotonic()
+    self._stats_connections = 0
+
+  @abc.abstractmethod
+  def n_connections(self):
+    """Count TCP connections opened so far."""
+
+  def log_stats(self, log):
+    """Log pool statistics if `stats_interval` seconds have passed since the
+    last report."""
+    now = time.monotonic()
+    if not self._stats_interval or \
+        now - self._stats_time < self._stats_interval:
+      return
+    stats_time, self._stats_time = self._stats_time, now
+    n_connections = self.n_connections()
+    log(POOL_STATS_LOG_PATTERN.format(
+        ts=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        pool=self._pool,
+        connections=n_connections,
+        requests=self._n_requests,
+        reuse_ratio=format(1 - n_connections / self._n_requests
+            if self._n_requests else 0.0, ".3f"),
+        connects_per_second=format((n_connections - self._stats_connections) /
+            (now - stats_time), ".3f")))
+    self._stats_connections = n_connections
+
+
+def _add_bounded(ids, id):
+  """Add an id to a list of at most `SESSION_HISTORY_LENGTH` ids, replacing a
+  random one if the list is full."""
+  if len(ids) < SESSION_HISTORY_LENGTH:
+    ids.append(id)
+  else:
+    ids[random.randrange(len(ids))] = id
+
+
+def _pop_random(ids):
+  """Remove and return a random id from a list, in constant time."""
+  i = random.randrange(len(ids))
+  id = ids[i]
+  ids[i] = ids[-1]
+  ids.pop()
+  return id
+
+
+class BuzzBlogSession:
+  """State of a BuzzBlog user.
+
+  Only the ids needed by later requests are kept, and at most
+  `SESSION_HISTORY_LENGTH` of the posts, follows, and likes created by the
+  user, so that the memory used by a session does not grow over time.
+  """
+
+  __slots__ = ["_password", "_credentials", "_account_id", "_my_post_ids",
+      "_my_follow_ids", "_my_like_ids", "_other_account_id", "_other_post_id"]
+
+  def __init__(self):
+    self._password = _random_string(16)
+    self._credentials = None
+    self._account_id = None
+    self._my_post_ids = []
+    self._my_follow_ids = []
+    self._my_like_ids = []
+    self._other_account_id = None
+    self._other_post_id = None
+
+  def credentials(self):
+    """Return (username, password) once the account has been created."""
+    return self._credentials
+
+  def create_account(self):
+    r = yield Request("post", "/account",
+        json={
+            "username": _random_string(16),
+            "password": self._password,
+            "first_name": _random_string(16),
+            "last_name": _random_string(16)
+        })
+    assert r.status_code == 200
+    account = r.json()
+    self._account_id = account["id"]
+    add_account(self._account_id)
+    self._credentials = (account["username"], self._password)
+
+  def update_account(self):
+    yield Request("put", "/account/%s" % self._account_id,
+        json={
+            "password": self._password,
+            "first_name": _random_string(16),
+            "last_name": _random_string(16)
+        })
+
+  def create_post(self):
+    r = yield Request("post", "/post", json={"text": _random_string(
+        _random_post_length()) + " " + random_hashtag()})
+    if r.status_code == 200:
+      post_id = r.json()["id"]
+      _add_bounded(self._my_post_ids, post_id)
+      add_post(post_id)
+
+  def delete_post(self):
+    if self._my_post_ids:
+      post_id = _pop_random(self._my_post_ids)
+      if _hot_posts is not None:
+        _hot_posts.remove(post_id)
+      yield Request("delete", "/post/%s" % post_id)
+
+  def follow_account(self):
+    if self._other_account_id is not None:
+      r = yield Request("post", "/follow",
+          json={"account_id": self._other_account_id})
+      if r.status_code == 200:
+        _add_bounded(self._my_follow_ids, r.json()["id"])
+      self._other_account_id = None
+
+  def delete_follow(self):
+    if self._my_follow_ids:
+      yield Request("delete", "/follow/%s" % _pop_random(self._my_follow_ids))
+
+  def like_post(self):
+    if self._other_post_id is not None:
+      r = yield Request("post", "/like",
+          json={"post_id": self._other_post_id})
+      if r.status_code == 200:
+        _add_bounded(self._my_like_ids, r.json()["id"])
+      self._other_post_id = None
+
+  def delete_like(self):
+    if self._my_like_ids:
+      yield Request("delete", "/like/%s" % _pop_random(self._my_like_ids))
+
+  def retrieve_recent_posts(self):
+    r = yield Request("get", "/post",
+        params={"limit": 1, "offset": 0})
+    if r.status_code == 200:
+      posts = r.json()
+      if posts:
+        self._other_post_id = _target_post(random.choice(posts)["id"])
+        self._other_account_id = _target_account(
+            random.choice(posts)["author"]["id"])
+
+  def retrieve_post(self):
+    if self._other_post_id is not None:
+      yield Request("get", "/post/%s" % self._other_post_id)
+
+  def retrieve_post_likes(self):
+    if self._other_post_id is not None:
+      yield Request("get", "/like", params={"post_id": self._other_post_id,
+          "limit": 1, "offset": 0})
+
+  def retrieve_account(self):
+    if self._other_account_id is not None:
+      yield Request("get", "/account/%s" % self._other_account_id)
+
+  def retrieve_account_posts(self):
+    if self._other_account_id is not None:
+      r = yield Request("get", "/post",
+          params={"author_id": self._other_account_id, "limit": 1,
+              "offset": 0})
+      if r.status_code == 200:
+        posts = r.json()
+        if posts:
+          self._other_post_id = _target_post(random.choice(posts)["id"])
+
+  def retrieve_account_followers(self):
+    if self._other_account_id is not None:
+      r = yield Request("get", "/follow",
+          params={"followee_id": self._other_account_id, "limit": 1,
+              "offset": 0})
+      if r.status_code == 200:
+        follows = r.json()
+        if follows:
+          self._other_account_id = _target_account(
+              random.choice(follows)["follower"]["id"])
+
+  def retrieve_account_followees(self):
+    if self._other_account_id is not None:
+      r = yield Request("get", "/follow",
+          params={"follower_id": self._other_account_id, "limit": 1,
+              "offset": 0})
+      if r.status_code == 200:
+        follows = r.json()
+        if follows:
+          self._other_account_id = _target_account(
+              random.choice(follows)["followee"]["id"])
+
+  def retrieve_account_likes(self):
+    if self._other_account_id is not None:
+      yield Request("get", "/like",
+          params={"account_id": self._other_account_id, "limit": 1,
+              "offset": 0})
+
+  def list_trending_hashtags(self):
+    yield Request("get", "/trending",
+        params={"limit": 10})
@@ -0,0 +1,118 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Workload generation with ATLoad, eventlet, and blocking `requests`."""
+
+import eventlet
+eventlet.monkey_patch(socket=True)
+
+import functools
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+import ATLoad
+
+import buzzblog
+
+
+class Transport(buzzblog.Transport):
+  def __init__(self, pool, pool_size, stats_interval):
+    super().__init__(pool, pool_size, stats_interval)
+    self._http_sessions = []
+    if self._pool == "process":
+      self._http_sessions.append(self._new_http_session())
+
+  def _new_http_session(self):
+    http_session = requests.Session()
+    http_session.mount("http://", HTTPAdapter(pool_connections=1,
+        pool_maxsize=self._pool_size))
+    return http_session
+
+  def http_session(self):
+    """Return the object to issue a new session's requests with."""
+    if self._pool == "none":
+      return requests
+    if self._pool == "process":
+      return self._http_sessions[0]
+    http_session = self._new_http_session()
+    self._http_sessions.append(http_session)
+    return http_session
+
+  def send(self, http_session, method, url, **kwargs):
+    self._n_requests += 1
+    return getattr(http_session, method)(url, **kwargs)
+
+  def n_connections(self):
+    if self._pool == "none":
+      return self._n_requests
+    n_connections = 0
+    for http_session in self._http_sessions:
+      for adapter in http_session.adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+          n_connections += pools[key].num_connections
+    return n_connections
+
+  def close(self):
+    for http_session in self._http_sessions:
+      http_session.close()
+
+
+class BuzzBlogSession(ATLoad.Session):
+  """ATLoad session running the request flows of a `buzzblog.BuzzBlogSession`.
+
+  ATLoad calls request types as methods of this class (e.g.,
+  `session.create_account()`), which are resolved by `__getattr__`.
+  """
+
+  def __init__(self, hostname, port, transport, request_recorder):
+    self._url_prefix = "http://{hostname}:{port}".format(hostname=hostname,
+        port=port)
+    self._transport = transport
+    self._request_recorder = request_recorder
+    self._http_session = transport.http_session()
+    self._session = buzzblog.BuzzBlogSession()
+
+  def __getattr__(self, request_type):
+    if request_type.startswith('_'):
+      raise AttributeError(request_type)
+    flow = getattr(self.__dict__["_session"], request_type)
+    return lambda: buzzblog.run_flow(flow(),
+        functools.partial(self._request, request_type))
+
+  def _request(self, request_type, request):
+    credentials = self._session.credentials()
+    auth = HTTPBasicAuth(*credentials) if credentials is not None else None
+    params = request.params or {}
+    params.update({"request_id": buzzblog.request_id()})
+    start_ns = time.monotonic_ns()
+    r = None
+    with eventlet.Timeout(30, False):
+      r = self._transport.send(self._http_session, request.method,
+          self._url_prefix + request.path, auth=auth, params=params,
+          json=request.json, timeout=30)
+    if r is None:
+      r = requests.Response()
+      r.status_code = 408
+    latency_ns = time.monotonic_ns() - start_ns
+    self._request_recorder.record(self._log, self._url_prefix, request_type,
+        request, params, r.status_code, start_ns, latency_ns)
+    self._transport.log_stats(self._log)
+    return r
+
+
+def run(args):
+  transport = Transport(args.pool, args.pool_size, args.pool_stats_interval)
+  request_recorder = buzzblog.RequestRecorder(args)
+  workload = ATLoad.Workload(args.workload_conf, args.log, BuzzBlogSession,
+      int(args.seed), args.hostname, args.port, transport, request_recorder)
+  random.seed(None)
+  try:
+    workload.run()
+  finally:
+    transport.close()
+    request_recorder.close()
@@ -0,0 +1,74 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Latency histograms.
+
+Histograms use HDR-style log-linear buckets: values (in microseconds) below
+`2 ** SUB_BUCKET_BITS` have a bucket each, and every following power of 2 is
+split into `2 ** (SUB_BUCKET_BITS - 1)` buckets, so that the width of a bucket
+is at most 1/64 of its lowest value. Histograms are mergeable by summing the
+counts of their buckets. `analysis/utils/histogram.py` reads histogram logs
+and must be updated along with `SUB_BUCKET_BITS`.
+"""
+
+import collections
+import datetime
+import threading
+import time
+
+SUB_BUCKET_BITS = 7
+HISTOGRAM_LOG_PATTERN = "[{ts}] type={type} status_code={status_code} " \
+    "interval={interval} counts={counts}"
+
+
+def bucket(value):
+  """Return the index of the bucket of a value."""
+  shift = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+  return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+
+class HistogramLog:
+  """Keep latency histograms per request type and status code, and log a
+  snapshot of them every `interval` seconds from a background thread.
+  Histograms are reset after every snapshot, whose interval is the time since
+  the previous one."""
+
+  def __init__(self, log_filepath, interval):
+    self._logfile = open(log_filepath, 'w')
+    self._interval = interval
+    self._snapshot_time = time.monotonic()
+    self._histograms = collections.defaultdict(collections.Counter)
+    self._histograms_lock = threading.Lock()
+    self._closed = threading.Event()
+    self._writer = threading.Thread(target=self._write_periodically,
+        daemon=True)
+    self._writer.start()
+
+  def record(self, request_type, status_code, latency_ns):
+    with self._histograms_lock:
+      self._histograms[(request_type, status_code)][
+          bucket(latency_ns // 1000)] += 1
+
+  def _write(self):
+    with self._histograms_lock:
+      histograms = self._histograms
+      self._histograms = collections.defaultdict(collections.Counter)
+    snapshot_time, self._snapshot_time = self._snapshot_time, time.monotonic()
+    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    for ((request_type, status_code), counts) in sorted(histograms.items()):
+      self._logfile.write(HISTOGRAM_LOG_PATTERN.format(ts=ts,
+          type=request_type, status_code=status_code,
+          interval=format(self._snapshot_time - snapshot_time, ".3f"),
+          counts=",".join(["%s:%s" % (i, count)
+              for (i, count) in sorted(counts.items())])) + "\n")
+    self._logfile.flush()
+
+  def _write_periodically(self):
+    while not self._closed.wait(self._interval):
+      self._write()
+
+  def close(self):
+    self._closed.set()
+    self._writer.join()
+    self._write()
+    self._logfile.close()
@@ -1,176 +1,118 @@
 # Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
 # Systems
 
-import eventlet
-eventlet.monkey_patch(socket=True)
-
 import argparse
-import datetime
-import random
-import string
-
-import requests
-from requests.auth import HTTPBasicAuth
-
-import ATLoad
-
-
-def _random_string(length):
-  letters = string.ascii_lowercase + string.ascii_uppercase + string.digits
-  return "".join(random.choice(letters) for _ in range(length))
-
-
-LOG_PATTERN = "[{ts}] {method} {url} {status_code} - latency={latency}"
-N_HASHTAGS = 1024
-HASHTAGS = ["#" + _random_string(10) for _ in range(N_HASHTAGS)]
-
-
-class BuzzBlogSession(ATLoad.Session):
-  def __init__(self, hostname, port):
-    self._url_prefix = "http://{hostname}:{port}".format(hostname=hostname,
-        port=port)
-    self._password = _random_string(16)
-    self._my_account = None
-    self._my_posts = []
-    self._my_follows = []
-    self._my_likes = []
-    self._other_account = None
-    self._other_post = None
-
-  def _request(self, method, path, params=None, json=None):
-    auth = HTTPBasicAuth(self._my_account["username"], self._password) \
-        if self._my_account is not None else None
-    params = params or {}
-    params.update({"request_id": _random_string(8)})
-    start_time = datetime.datetime.now()
-    r = None
-    with eventlet.Timeout(30, False):
-      r = getattr(requests, method)(self._url_prefix + path, auth=auth, params=params, json=json, timeout=30)
-    if r is None:
-      r = requests.Response()
-      r.status_code = 408
-    latency = round((datetime.datetime.now() - start_time).total_seconds(), 3)
-    query_string = "&".join(["%s=%s" % (k, v) for (k, v) in params.items()]) \
-        if params is not None else ""
-    self._log(LOG_PATTERN.format(
-        ts=start_time.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
-        method=method.upper(),
-        url=self._url_prefix + path +
-            ("?" + query_string if query_string else ""),
-        status_code=r.status_code,
-        latency=format(latency, ".3f")))
-    return r
-
-  def create_account(self):
-    r = self._request("post", "/account",
-        json={
-            "username": _random_string(16),
-            "password": self._password,
-            "first_name": _random_string(16),
-            "last_name": _random_string(16)
-        })
-    assert r.status_code == 200
-    self._my_account = r.json()
-
-  def update_account(self):
-    r = self._request("put", "/account/%s" % self._my_account["id"],
-        json={
-            "password": self._password,
-            "first_name": _random_string(16),
-            "last_name": _random_string(16)
-        })
-    if r.status_code == 200:
-      self._my_account = r.json()
-
-  def create_post(self):
-    r = self._request("post", "/post", json={"text": _random_string(128) + " " + random.choice(HASHTAGS)})
-    if r.status_code == 200:
-      self._my_posts.append(r.json())
-
-  def delete_post(self):
-    if self._my_posts:
-      post = self._my_posts.pop(random.randrange(len(self._my_posts)))
-      self._request("delete", "/post/%s" % post["id"])
-
-  def follow_account(self):
-    if self._other_account:
-      r = self._request("post", "/follow",
-          json={"account_id": self._other_account["id"]})
-      if r.status_code == 200:
-        self._my_follows.append(r.json())
-      self._other_account = None
-
-  def delete_follow(self):
-    if self._my_follows:
-      follow = self._my_follows.pop(random.randrange(len(self._my_follows)))
-      self._request("delete", "/follow/%s" % follow["id"])
-
-  def like_post(self):
-    if self._other_post:
-      r = self._request("post", "/like",
-          json={"post_id": self._other_post["id"]})
-      if r.status_code == 200:
-        self._my_likes.append(r.json())
-      self._other_post = None
-
-  def delete_like(self):
-    if self._my_likes:
-      like = self._my_likes.pop(random.randrange(len(self._my_likes)))
-      self._request("delete", "/like/%s" % like["id"])
-
-  def retrieve_recent_posts(self):
-    r = self._request("get", "/post",
-        params={"limit": 1, "offset": 0})
-    if r.status_code == 200 and r.json():
-      self._other_post = random.choice(r.json())
-      self._other_account = random.choice(r.json())["author"]
-
-  def retrieve_post(self):
-    if self._other_post:
-      self._request("get", "/post/%s" % self._other_post["id"])
-
-  def retrieve_post_likes(self):
-    if self._other_post:
-      self._request("get", "/like", params={"post_id": self._other_post["id"],
-          "limit": 1, "offset": 0})
-
-  def retrieve_account(self):
-    if self._other_account:
-      self._request("get", "/account/%s" % self._other_account["id"])
-
-  def retrieve_account_posts(self):
-    if self._other_account:
-      r = self._request("get", "/post",
-          params={"author_id": self._other_account["id"], "limit": 1,
-              "offset": 0})
-      if r.status_code == 200 and r.json():
-        self._other_post = random.choice(r.json())
-
-  def retrieve_account_followers(self):
-    if self._other_account:
-      r = self._request("get", "/follow",
-          params={"followee_id": self._other_account["id"], "limit": 1,
-              "offset": 0})
-      if r.status_code == 200 and r.json():
-        self._other_account = random.choice(r.json())["follower"]
-
-  def retrieve_account_followees(self):
-    if self._other_account:
-      r = self._request("get", "/follow",
-          params={"follower_id": self._other_account["id"], "limit": 1,
-              "offset": 0})
-      if r.status_code == 200 and r.json():
-        self._other_account = random.choice(r.json())["followee"]
-
-  def retrieve_account_likes(self):
-    if self._other_account:
-      self._request("get", "/like",
-          params={"account_id": self._other_account["id"], "limit": 1,
-              "offset": 0})
-
-  def list_trending_hashtags(self):
-    r = self._request("get", "/trending",
-        params={"limit": 10})
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+
+import yaml
+
+import buzzblog
+
+ENGINES = ["eventlet", "asyncio"]
+
+
+def _run_engine(args):
+  # Engines are imported on demand because the eventlet engine monkey-patches
+  # the socket module.
+  if args.engine == "eventlet":
+    import eventlet_engine as engine
+  else:
+    import asyncio_engine as engine
+  engine.run(args)
+
+
+def _shard_workload_conf(workload_conf, n_workers):
+  """Split sessions and throughput of a workload configuration across
+  workers."""
+  shards = []
+  for worker_no in range(n_workers):
+    shard = dict(workload_conf)
+    shard["sessions"] = workload_conf["sessions"] // n_workers + \
+        (1 if worker_no < workload_conf["sessions"] % n_workers else 0)
+    shard["throughput"] = workload_conf["throughput"] * shard["sessions"] / \
+        workload_conf["sessions"]
+    shards.append(shard)
+  return shards
+
+
+def _merge_logs(log_filepaths, log_filepath):
+  log_filepaths = [worker_log_filepath for worker_log_filepath in log_filepaths
+      if os.path.exists(worker_log_filepath)]
+  if not log_filepaths:
+    return
+  with open(log_filepath, "wb") as logfile:
+    for worker_log_filepath in log_filepaths:
+      with open(worker_log_filepath, "rb") as worker_logfile:
+        shutil.copyfileobj(worker_logfile, logfile)
+      os.remove(worker_log_filepath)
+
+
+def _prepare(args, dirpath):
+  """Set payloads and popularity, and populate BuzzBlog as set by the
+  `population` block of the workload configuration, if any. Point
+  `args.workload_conf` to a copy of the workload configuration (in `dirpath`)
+  without the blocks that are only read by the workload generator. Return
+  whether the workload configuration is for populating only."""
+  with open(args.workload_conf) as workload_conf_file:
+    workload_conf = yaml.load(workload_conf_file, Loader=yaml.Loader)
+  buzzblog.set_post_length(args.post_length, args.post_length_distribution)
+  buzzblog.set_popularity(workload_conf.pop("popularity", {}))
+  if "population" in workload_conf:
+    # Imported on demand, like engines, because it uses aiohttp.
+    import populate
+    populate.Population(workload_conf.pop("population"), int(args.seed),
+        args.hostname, args.port).run()
+  populate_only = workload_conf.pop("populate_only", False)
+  args.workload_conf = os.path.join(dirpath, "workload.yml")
+  with open(args.workload_conf, 'w') as workload_conf_file:
+    workload_conf_file.write(yaml.dump(workload_conf))
+  return populate_only
+
+
+def _run_workers(args):
+  """Run `args.workers` processes, each generating a shard of the workload, and
+  merge their logs into `args.log`."""
+  with open(args.workload_conf) as workload_conf_file:
+    workload_conf = yaml.load(workload_conf_file, Loader=yaml.Loader)
+  context = multiprocessing.get_context("fork")
+  workers = []
+  with tempfile.TemporaryDirectory() as dirpath:
+    for (worker_no, shard) in enumerate(_shard_workload_conf(workload_conf,
+        args.workers)):
+      worker_args = argparse.Namespace(**vars(args))
+      worker_args.workload_conf = os.path.join(dirpath,
+          "workload.%s.yml" % worker_no)
+      worker_args.log = "%s.%s" % (args.log, worker_no)
+      worker_args.binary_log = "%s.%s" % (args.binary_log, worker_no)
+      worker_args.histogram_log = "%s.%s" % (args.histogram_log, worker_no)
+      worker_args.seed = str(int(args.seed) + worker_no)
+      with open(worker_args.workload_conf, 'w') as shard_file:
+        shard_file.write(yaml.dump(shard))
+      workers.append((worker_args,
+          context.Process(target=_run_engine, args=(worker_args,))))
+    try:
+      for (_, worker) in workers:
+        worker.start()
+      # Workers are stopped with the workload generator (e.g., by
+      # `docker stop`), and their logs are still merged.
+      signal.signal(signal.SIGTERM, lambda signum, frame: [worker.terminate()
+          for (_, worker) in workers if worker.is_alive()])
+      for (_, worker) in workers:
+        worker.join()
+    finally:
+      _merge_logs([worker_args.log for (worker_args, _) in workers], args.log)
+      _merge_logs([worker_args.binary_log for (worker_args, _) in workers],
+          args.binary_log)
+      _merge_logs([worker_args.histogram_log for (worker_args, _) in workers],
+          args.histogram_log)
+  # Exit codes of workers killed by a signal are negative.
+  return next((worker.exitcode for (_, worker) in workers if worker.exitcode),
+      0)
 
 
 if __name__ == "__main__":
@@ -186,9 +128,49 @@ if __name__ == "__main__":
       help="Load balancer (or API Gateway) server")
   parser.add_argument("--seed", required=True, action="store", type=str,
       help="Random number generator seed")
+  parser.add_argument("--engine", required=False, default="eventlet",
+      action="store", type=str, choices=ENGINES,
+      help="Workload generation engine")
+  parser.add_argument("--schedule", required=False, default="closed",
+      action="store", type=str, choices=buzzblog.SCHEDULES,
+      help="Request scheduling of sessions (asyncio engine only)")
+  parser.add_argument("--workers", required=False, default=1, action="store",
+      type=int, help="Number of processes to shard sessions and throughput "
+          "across")
+  parser.add_argument("--log_format", required=False, default="text",
+      action="store", type=str, choices=buzzblog.LOG_FORMATS,
+      help="Format of request logs (binary request logs are written to the "
+          "log file path with extension .bin)")
+  parser.add_argument("--histogram_interval", required=False, default=0,
+      action="store", type=float,
+      help="Interval (in seconds) between snapshots of latency histograms, "
+          "written to the log file path with extension .hist (0 disables "
+          "them)")
+  parser.add_argument("--post_length", required=False, default=128,
+      action="store", type=int,
+      help="Mean length of post texts (excluding their hashtag)")
+  parser.add_argument("--post_length_distribution", required=False,
+      default="constant", action="store", type=str,
+      choices=buzzblog.POST_LENGTH_DISTRIBUTIONS,
+      help="Distribution of the length of post texts")
+  parser.add_argument("--pool", required=False, default="none",
+      action="store", type=str, choices=buzzblog.POOL_MODES,
+      help="Keep-alive connection pooling mode")
+  parser.add_argument("--pool_size", required=False, default=1,
+      action="store", type=int,
+      help="Maximum number of keep-alive connections per pool")
+  parser.add_argument("--pool_stats_interval", required=False, default=10,
+      action="store", type=float,
+      help="Interval (in seconds) between pool statistics log lines "
+          "(0 disables them)")
   args = parser.parse_args()
-  # Generate workload.
-  workload = ATLoad.Workload(args.workload_conf, args.log, BuzzBlogSession,
-      int(args.seed), args.hostname, args.port)
-  random.seed(None)
-  workload.run()
+  args.binary_log = os.path.splitext(args.log)[0] + ".bin"
+  args.histogram_log = os.path.splitext(args.log)[0] + ".hist"
+  with tempfile.TemporaryDirectory() as dirpath:
+    # Populate BuzzBlog.
+    if _prepare(args, dirpath):
+      sys.exit(0)
+    # Generate workload.
+    if args.workers > 1:
+      sys.exit(_run_workers(args))
+    _run_engine(args)
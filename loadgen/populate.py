@@ -0,0 +1,142 @@
+# Copyright (C) 2020 Georgia Tech Center for Experimental Research in Computer
+# Systems
+
+"""Bulk population of BuzzBlog before the measured workload.
+
+The `population` block of a workload configuration sets how many accounts,
+posts, follows, and likes to create, and with how many concurrent requests:
+
+  population:
+    accounts: 10000
+    posts: 100000
+    follows: 100000
+    likes: 100000
+    concurrency: 256
+
+Accounts are created first. Posts are then created by accounts in turn, and
+follows and likes are made by accounts in turn on random accounts and posts.
+Every phase is reported to standard output with its request rate.
+"""
+
+import asyncio
+import datetime
+import random
+import time
+
+import aiohttp
+
+import buzzblog
+
+POPULATION_LOG_PATTERN = "[{ts}] population phase={phase} " \
+    "requests={requests} successful={successful} duration={duration} " \
+    "rate={rate}"
+DEFAULT_CONCURRENCY = 256
+
+
+class Population:
+  def __init__(self, population_conf, seed, hostname, port):
+    self._conf = population_conf
+    self._random = random.Random(seed)
+    self._url_prefix = "http://{hostname}:{port}".format(hostname=hostname,
+        port=port)
+    self._http_session = None
+    # (id, BasicAuth) of created accounts.
+    self._accounts = []
+    self._post_ids = []
+
+  async def _request(self, method, path, auth=None, json=None):
+    """Send a request and return its decoded response, or None if it
+    failed."""
+    try:
+      async with self._http_session.request(method, self._url_prefix + path,
+          auth=auth, json=json,
+          params={"request_id": buzzblog.request_id()}) as r:
+        if r.status != 200:
+          return None
+        return await r.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+      return None
+
+  async def _run_phase(self, phase, n_requests, request):
+    """Run `request(i)` for every `i` in `range(n_requests)`, with up to
+    `concurrency` requests at a time, and report the phase."""
+    start_time = time.monotonic()
+    requests = iter(range(n_requests))
+    n_successful = 0
+
+    async def worker():
+      nonlocal n_successful
+      for i in requests:
+        response = await request(i)
+        n_successful += response is not None
+
+    await asyncio.gather(*[worker() for _ in range(
+        self._conf.get("concurrency", DEFAULT_CONCURRENCY))])
+    duration = time.monotonic() - start_time
+    print(POPULATION_LOG_PATTERN.format(
+        ts=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3],
+        phase=phase,
+        requests=n_requests,
+        successful=n_successful,
+        duration=format(duration, ".3f"),
+        rate=format(n_requests / duration if duration else 0.0, ".3f")),
+        flush=True)
+
+  async def _create_account(self, i):
+    password = buzzblog._random_string(16)
+    account = await self._request("post", "/account", json={
+        "username": buzzblog._random_string(16),
+        "password": password,
+        "first_name": buzzblog._random_string(16),
+        "last_name": buzzblog._random_string(16)
+    })
+    if account is not None:
+      buzzblog.add_account(account["id"])
+      self._accounts.append((account["id"],
+          aiohttp.BasicAuth(account["username"], password)))
+    return account
+
+  async def _create_post(self, i):
+    _, auth = self._accounts[i % len(self._accounts)]
+    post = await self._request("post", "/post", auth=auth, json={
+        "text": buzzblog._random_string(buzzblog._random_post_length()) +
+            " " + buzzblog.random_hashtag()
+    })
+    if post is not None:
+      buzzblog.add_post(post["id"])
+      self._post_ids.append(post["id"])
+    return post
+
+  async def _follow_account(self, i):
+    n_accounts = len(self._accounts)
+    _, auth = self._accounts[i % n_accounts]
+    # Accounts do not follow themselves.
+    followee_id, _ = self._accounts[(i + self._random.randrange(1,
+        n_accounts)) % n_accounts]
+    return await self._request("post", "/follow", auth=auth,
+        json={"account_id": followee_id})
+
+  async def _like_post(self, i):
+    _, auth = self._accounts[i % len(self._accounts)]
+    return await self._request("post", "/like", auth=auth,
+        json={"post_id": self._random.choice(self._post_ids)})
+
+  async def _run(self):
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=0),
+        timeout=aiohttp.ClientTimeout(total=30)) as self._http_session:
+      await self._run_phase("accounts", self._conf.get("accounts", 0),
+          self._create_account)
+      if not self._accounts:
+        return
+      await self._run_phase("posts", self._conf.get("posts", 0),
+          self._create_post)
+      if len(self._accounts) > 1:
+        await self._run_phase("follows", self._conf.get("follows", 0),
+            self._follow_account)
+      if self._post_ids:
+        await self._run_phase("likes", self._conf.get("likes", 0),
+            self._like_post)
+
+  def run(self):
+    asyncio.run(self._run())